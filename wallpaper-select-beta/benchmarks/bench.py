@@ -0,0 +1,341 @@
+"""Headless benchmarks for huegen-gui.
+
+    python benchmarks/bench.py                          # 1k, 10k and 50k files
+    python benchmarks/bench.py --sizes 1000 --output results.json
+    python benchmarks/bench.py --compare old.json new.json
+
+Each library size is measured twice, with a cold cache and then a warm
+one, each in a fresh process running WallpaperApp on the offscreen
+platform. The wallpaper command, ffmpeg and ffprobe are stubs that return
+at once, so the numbers measure the app rather than external tools.
+Results are written as JSON (one record per size and cache state).
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import subprocess
+import tempfile
+import statistics
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(os.path.dirname(HERE), "src")
+
+DEFAULT_SIZES = [1000, 10000, 50000]
+SEARCH_QUERIES = ["sunset", "neon night", "ext:png", "w>=2560", "ratio:16:9", "color:blue", "sort:brightness"]
+RESIZE_STEPS = 40
+ARROW_STEPS = 60
+
+STUB_FFMPEG = """#!/bin/sh
+# Frame grabs (image2pipe) print a PNG, conversions write the output file
+for last; do :; done
+case "$*" in
+    *image2pipe*) cat "$HUEGEN_BENCH_FRAME" ;;
+    *) echo "  Duration: 00:00:01.00, start: 0" >&2
+       echo "out_time_us=1000000"; echo "progress=end"
+       printf 'RIFF\\0\\0\\0\\0WEBPVP8 ' > "$last" ;;
+esac
+"""
+STUB_FFPROBE = """#!/bin/sh
+printf 'width=1920\\nheight=1080\\nduration=30.000000\\n'
+"""
+STUB_COMMAND = """#!/bin/sh
+exit 0
+"""
+
+
+def percentiles(samples):
+    """Median, p95 and max of samples (seconds) in milliseconds"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "samples": len(ordered),
+    }
+
+
+def write_stubs(directory):
+    """Stub ffmpeg, ffprobe and wallpaper command plus the frame ffmpeg prints"""
+    from PySide6.QtGui import QImage, QColor
+
+    os.makedirs(directory, exist_ok=True)
+    for name, body in (("ffmpeg", STUB_FFMPEG), ("ffprobe", STUB_FFPROBE), ("set-wallpaper", STUB_COMMAND)):
+        path = os.path.join(directory, name)
+        with open(path, "w") as f:
+            f.write(body)
+        os.chmod(path, 0o755)
+    frame = QImage(320, 180, QImage.Format_RGB32)
+    frame.fill(QColor("#3b5b92"))
+    frame.save(os.path.join(directory, "frame.png"))
+    return directory
+
+
+# Child process: one measured run of the app
+
+
+def run_child(args):
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    sys.path.insert(0, SRC)
+    from PySide6.QtCore import Qt, QEvent, QEventLoop
+    from PySide6.QtGui import QKeyEvent
+    from PySide6.QtWidgets import QApplication
+
+    app = QApplication([])
+    from app import WallpaperApp
+    from catalog import FAILED
+
+    def spin(condition, timeout):
+        """Process events until condition() holds; returns the elapsed time or None on timeout"""
+        start = time.perf_counter()
+        while not condition():
+            if time.perf_counter() - start > timeout:
+                return None
+            app.processEvents(QEventLoop.AllEvents, 20)
+            time.sleep(0.001)
+        return time.perf_counter() - start
+
+    result = {}
+    marks = {}
+    start = time.perf_counter()
+    window = WallpaperApp(args.config)
+    window.image_loader.image_loaded.connect(
+        lambda *_: marks.setdefault("first_thumbnail", time.perf_counter() - start)
+    )
+    window.resize(1280, 800)
+    window.show()
+    grid = window.grid_widget
+    catalog = window.catalog
+
+    # Wrapped before the scan starts, so the mark is set right after the app
+    # handled the end of the scan (every batch of files was delivered by then)
+    on_scan_finished = window.on_scan_finished
+
+    def scan_finished():
+        on_scan_finished()
+        marks.setdefault("scanned", time.perf_counter() - start)
+
+    window.on_scan_finished = scan_finished
+
+    def scanned():
+        return "scanned" in marks
+
+    def all_loaded():
+        done = catalog.loaded_count + catalog.states.count(FAILED)
+        return scanned() and len(catalog) and done >= len(catalog)
+
+    def since_start(elapsed):
+        """Seconds since the window was created, None if the wait timed out"""
+        return None if elapsed is None else round(time.perf_counter() - start, 3)
+
+    result["scan_s"] = since_start(spin(scanned, args.timeout))
+    spin(lambda: "first_thumbnail" in marks, args.timeout)
+    result["first_thumbnail_s"] = round(marks["first_thumbnail"], 3) if "first_thumbnail" in marks else None
+    result["all_thumbnails_s"] = since_start(spin(all_loaded, args.timeout))
+    result["files"] = len(catalog)
+    result["thumbnails_loaded"] = catalog.loaded_count
+    result["thumbnails_failed"] = catalog.states.count(FAILED)
+
+    # Live resize: every step re-flows and paints, like a dragged window edge
+    samples = []
+    for i in range(RESIZE_STEPS):
+        width = 1000 + (i % 10) * 60
+        t = time.perf_counter()
+        window.resize(width, 800)
+        app.processEvents()
+        grid.viewport().repaint()
+        samples.append(time.perf_counter() - t)
+    result["resize"] = percentiles(samples)
+    spin(lambda: not grid.resizing, 5)
+
+    # Search: one filter per keystroke, as typed (the app debounces on top of this)
+    samples = []
+    for query in SEARCH_QUERIES:
+        for end in range(1, len(query) + 1):
+            t = time.perf_counter()
+            grid.filter_by_text(query[:end])
+            grid.viewport().repaint()
+            samples.append(time.perf_counter() - t)
+        grid.filter_by_text("")
+    result["search_keystroke"] = percentiles(samples)
+
+    # Held arrow key: auto-repeated presses, each followed by a paint
+    grid.setFocus()
+    grid.select_item(0)
+    samples = []
+    for i in range(ARROW_STEPS):
+        t = time.perf_counter()
+        app.sendEvent(grid, QKeyEvent(QEvent.KeyPress, Qt.Key_Down, Qt.NoModifier, "", i > 0))
+        app.processEvents()
+        grid.viewport().repaint()
+        samples.append(time.perf_counter() - t)
+    app.sendEvent(grid, QKeyEvent(QEvent.KeyRelease, Qt.Key_Down, Qt.NoModifier))
+    result["arrow_key"] = percentiles(samples)
+
+    # Apply: a still image, then an MP4 (converted by the stub ffmpeg, cached afterwards)
+    paths = sorted(catalog.path_index)
+    still = next((p for p in paths if not p.endswith(".mp4")), None)
+    video = next((p for p in paths if p.endswith(".mp4")), None)
+    pipeline = window.apply_pipeline
+    if still:
+        t = time.perf_counter()
+        window.execute_wallpaper_command(still)
+        done = spin(lambda: not pipeline.is_busy(), 30) is not None
+        result["apply_still_ms"] = round((time.perf_counter() - t) * 1000, 3) if done else None
+    if video:
+        t = time.perf_counter()
+        window.execute_wallpaper_command(video)
+        done = spin(lambda: not pipeline.is_busy(), 30) is not None
+        result["apply_video_ms"] = round((time.perf_counter() - t) * 1000, 3) if done else None
+
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    window.close()
+    with open(args.result_file, "w") as f:
+        json.dump(result, f)
+
+
+# Parent process: libraries, stubs and one child per run
+
+
+def measure(library, cache_dir, stubs, timeout):
+    config = os.path.join(cache_dir, "config.json")
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(config, "w") as f:
+        json.dump(
+            {
+                "wallpaper_dir": library,
+                "wallpaper_command": os.path.join(stubs, "set-wallpaper") + " {path}",
+                "thumbnail_size": 180,
+            },
+            f,
+        )
+    env = dict(
+        os.environ,
+        QT_QPA_PLATFORM="offscreen",
+        XDG_CACHE_HOME=os.path.join(cache_dir, "cache"),
+        PATH=stubs + os.pathsep + os.environ.get("PATH", ""),
+        HUEGEN_BENCH_FRAME=os.path.join(stubs, "frame.png"),
+    )
+    result_file = os.path.join(cache_dir, "result.json")
+    if os.path.exists(result_file):
+        os.remove(result_file)
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--config", config,
+         "--result-file", result_file, "--timeout", str(timeout)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    if process.returncode != 0 or not os.path.exists(result_file):
+        return {"error": f"benchmark process exited with code {process.returncode}"}
+    with open(result_file) as f:
+        return json.load(f)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmarks(args):
+    from PySide6.QtWidgets import QApplication
+    import PySide6
+    from library import generate_library
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication([])  # QPainter needs it for the templates
+    work_dir = args.work_dir or os.path.join(tempfile.gettempdir(), "huegen-bench")
+    stubs = write_stubs(os.path.join(work_dir, "stubs"))
+    runs = []
+    for size in args.sizes:
+        t = time.perf_counter()
+        library = generate_library(
+            os.path.join(work_dir, f"library-{size}"), size, os.path.join(work_dir, "templates")
+        )
+        print(f"{size} files: library ready in {time.perf_counter() - t:.1f} s", flush=True)
+        cache_dir = os.path.join(work_dir, f"cache-{size}")
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        for state in ("cold", "warm"):
+            result = measure(library, cache_dir, stubs, args.timeout)
+            runs.append(dict(size=size, cache=state, **result))
+            print(f"{size} files, {state} cache: {json.dumps(result)}", flush=True)
+        if not args.keep:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    del app
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "pyside": PySide6.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "runs": runs,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+def flatten(run):
+    """Scalar metrics of a run, e.g. {'resize.p95_ms': 4.1, 'scan_s': 0.8}"""
+    values = {}
+    for key, value in run.items():
+        if isinstance(value, dict):
+            for inner, number in value.items():
+                if inner != "samples":
+                    values[f"{key}.{inner}"] = number
+        elif isinstance(value, (int, float)) and key != "size":
+            values[key] = value
+    return values
+
+
+def compare(old_path, new_path):
+    """Print every metric of two result files side by side with the relative change"""
+    with open(old_path) as f:
+        old = {(r["size"], r["cache"]): flatten(r) for r in json.load(f)["runs"]}
+    with open(new_path) as f:
+        new = {(r["size"], r["cache"]): flatten(r) for r in json.load(f)["runs"]}
+    for key in sorted(old.keys() & new.keys()):
+        print(f"{key[0]} files, {key[1]} cache")
+        for metric in sorted(old[key].keys() & new[key].keys()):
+            before, after = old[key][metric], new[key][metric]
+            change = f"{(after - before) / before:+.1%}" if before else ""
+            print(f"  {metric:<28} {before:>12} {after:>12} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="library sizes to measure")
+    parser.add_argument("--output", default="benchmark-results.json", help="where to write the JSON results")
+    parser.add_argument("--work-dir", help="where libraries and caches are kept (default: $TMPDIR/huegen-bench)")
+    parser.add_argument("--timeout", type=float, default=900, help="seconds to wait for scanning/thumbnails")
+    parser.add_argument("--keep", action="store_true", help="keep the thumbnail caches after the run")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--config", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    elif args.child:
+        run_child(args)
+    else:
+        run_benchmarks(args)
+
+
+if __name__ == "__main__":
+    main()
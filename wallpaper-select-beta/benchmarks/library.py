@@ -0,0 +1,120 @@
+"""Synthetic wallpaper libraries for the benchmarks.
+
+A small pool of template files (every format at several resolutions) is
+rendered once and hard-linked into a directory tree of the requested size,
+so a 50k library costs a few seconds and almost no disk space. MP4 files
+are placeholders: the stub ffmpeg/ffprobe from bench.py decode them.
+"""
+import os
+import random
+import shutil
+
+from PySide6.QtCore import Qt, QPointF
+from PySide6.QtGui import QImage, QPainter, QColor, QLinearGradient
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional, GIFs are left out without it
+    Image = None
+
+
+# (extension, share of the library)
+FORMATS = [(".jpg", 0.45), (".png", 0.22), (".webp", 0.15), (".gif", 0.10), (".mp4", 0.08)]
+RESOLUTIONS = [(1280, 720), (1920, 1080), (2560, 1440), (3840, 2160), (1080, 1920), (1600, 1600)]
+VARIANTS = 2  # templates per format and resolution
+GIF_FRAMES = 8
+FILES_PER_DIR = 250
+CATEGORIES = ["nature", "city", "space", "anime", "minimal", "abstract", "retro", "ocean"]
+WORDS = [
+    "sunset", "forest", "mountain", "neon", "night", "rain", "desert", "aurora", "lake",
+    "street", "galaxy", "sakura", "snow", "fog", "pixel", "wave", "tower", "river",
+]
+
+
+def render_template(width, height, seed):
+    """A gradient with random shapes, detailed enough that decoding is not trivial"""
+    rng = random.Random(seed)
+    image = QImage(width, height, QImage.Format_RGB32)
+    painter = QPainter(image)
+    gradient = QLinearGradient(QPointF(0, 0), QPointF(width, height))
+    gradient.setColorAt(0, QColor.fromHsv(rng.randrange(360), 160, 200))
+    gradient.setColorAt(1, QColor.fromHsv(rng.randrange(360), 200, 60))
+    painter.fillRect(image.rect(), gradient)
+    painter.setPen(Qt.NoPen)
+    for _ in range(60):
+        painter.setBrush(QColor.fromHsv(rng.randrange(360), rng.randrange(256), rng.randrange(256), 160))
+        w, h = rng.randrange(width // 20, width // 3), rng.randrange(height // 20, height // 3)
+        painter.drawEllipse(rng.randrange(width), rng.randrange(height), w, h)
+    painter.end()
+    return image
+
+
+def write_template(image, path, ext, seed):
+    if ext == ".mp4":
+        # Container-ish header plus padding; only ever opened by the stub ffmpeg
+        with open(path, "wb") as f:
+            f.write(b"\x00\x00\x00\x18ftypmp42" + os.urandom(64 * 1024 * (1 + seed % 4)))
+        return True
+    if ext == ".gif":
+        if Image is None:
+            return False
+        small = image.scaled(image.width() // 2, image.height() // 2).convertToFormat(QImage.Format_RGB888)
+        base = Image.frombytes(
+            "RGB", (small.width(), small.height()), bytes(small.constBits()), "raw", "RGB", small.bytesPerLine()
+        )
+        frames = [base.rotate(i * 360 / GIF_FRAMES).quantize(64) for i in range(GIF_FRAMES)]
+        frames[0].save(path, save_all=True, append_images=frames[1:], duration=80, loop=0)
+        return True
+    return image.save(path, None, 85)
+
+
+def build_templates(directory):
+    """Render the template pool; returns {extension: [paths]}"""
+    os.makedirs(directory, exist_ok=True)
+    templates = {}
+    seed = 0
+    for width, height in RESOLUTIONS:
+        for variant in range(VARIANTS):
+            seed += 1
+            image = None
+            for ext, _share in FORMATS:
+                path = os.path.join(directory, f"{width}x{height}-{variant}{ext}")
+                if not os.path.exists(path):
+                    if image is None and ext != ".mp4":
+                        image = render_template(width, height, seed)
+                    if not write_template(image, path, ext, seed):
+                        continue
+                templates.setdefault(ext, []).append(path)
+    return templates
+
+
+def generate_library(directory, count, template_dir, seed=1):
+    """Create (or reuse) a library of count files under directory; returns its path"""
+    marker = os.path.join(directory, ".complete")
+    if os.path.exists(marker):
+        return directory
+    if os.path.isdir(directory):
+        shutil.rmtree(directory)
+    templates = build_templates(template_dir)
+    formats = [(ext, share) for ext, share in FORMATS if ext in templates]
+    rng = random.Random(seed)
+    extensions = rng.choices([ext for ext, _ in formats], [share for _, share in formats], k=count)
+
+    created = set()
+    for i, ext in enumerate(extensions):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        subdir = os.path.join(directory, category, f"set-{i // (FILES_PER_DIR * len(CATEGORIES)):03d}")
+        if subdir not in created:
+            os.makedirs(subdir, exist_ok=True)
+            created.add(subdir)
+        name = f"{rng.choice(WORDS)}-{rng.choice(WORDS)}-{i:06d}{ext}"
+        target = os.path.join(subdir, name)
+        source = rng.choice(templates[ext])
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+
+    with open(marker, "w") as f:
+        f.write(str(count))
+    return directory
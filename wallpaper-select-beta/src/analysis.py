@@ -0,0 +1,153 @@
+import colorsys
+from collections import Counter
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QImage
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, palettes fall back to a plain histogram
+    np = None
+
+
+PALETTE_SIZE = 5
+SAMPLE_SIZE = 64  # thumbnails are downsampled to SAMPLE_SIZE x SAMPLE_SIZE
+KMEANS_ITERATIONS = 6
+
+
+def perceptual_hash(image):
+    """64-bit difference hash (dHash) of a thumbnail, as 16 hex digits"""
+    small = image.convertToFormat(QImage.Format_Grayscale8).scaled(
+        9, 8, Qt.IgnoreAspectRatio, Qt.SmoothTransformation
+    )
+    value = 0
+    for y in range(8):
+        row = small.constScanLine(y).tobytes()
+        for x in range(8):
+            value = (value << 1) | (row[x] > row[x + 1])
+    return f"{value:016x}"
+
+
+def _sample(image, size):
+    return image.scaled(size, size, Qt.IgnoreAspectRatio, Qt.FastTransformation).convertToFormat(
+        QImage.Format_RGB888
+    )
+
+
+def palette(image, count=PALETTE_SIZE):
+    """Dominant colors of a thumbnail as [((r, g, b), share)], largest share first.
+
+    Pixels of a downsampled copy are quantized to 4 bits per channel, the
+    most populated buckets seed a few rounds of k-means, and every cluster
+    is reported with the fraction of pixels it holds.
+    """
+    if np is None:
+        return _histogram_palette(image, count)
+
+    small = _sample(image, SAMPLE_SIZE)
+    width, height = small.width(), small.height()
+    rows = np.frombuffer(small.constBits(), np.uint8, small.bytesPerLine() * height)
+    pixels = rows.reshape(height, -1)[:, :width * 3].reshape(-1, 3).astype(np.float32)
+
+    quantized = pixels.astype(np.int32) >> 4
+    codes = (quantized[:, 0] << 8) | (quantized[:, 1] << 4) | quantized[:, 2]
+    counts = np.bincount(codes, minlength=4096)
+    seeds = np.argsort(counts)[::-1][:count]
+    seeds = seeds[counts[seeds] > 0]
+    centers = np.stack([(seeds >> 8) & 15, (seeds >> 4) & 15, seeds & 15], axis=1) * 16.0 + 8.0
+
+    for _ in range(KMEANS_ITERATIONS):
+        distances = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        labels = distances.argmin(axis=1)
+        sizes = np.bincount(labels, minlength=len(centers))
+        keep = sizes > 0
+        sums = np.stack(
+            [np.bincount(labels, weights=pixels[:, c], minlength=len(centers)) for c in range(3)], axis=1
+        )
+        centers = sums[keep] / sizes[keep, None]
+
+    labels = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    sizes = np.bincount(labels, minlength=len(centers))
+    order = np.argsort(sizes)[::-1]
+    total = len(pixels)
+    return [
+        (tuple(int(round(v)) for v in centers[i]), sizes[i] / total)
+        for i in order if sizes[i]
+    ]
+
+
+def _histogram_palette(image, count):
+    small = _sample(image, 32)
+    buckets = Counter()
+    sums = {}
+    for y in range(small.height()):
+        row = small.constScanLine(y).tobytes()
+        for x in range(0, small.width() * 3, 3):
+            r, g, b = row[x], row[x + 1], row[x + 2]
+            key = (r >> 4, g >> 4, b >> 4)
+            buckets[key] += 1
+            total = sums.get(key)
+            if total is None:
+                sums[key] = [r, g, b]
+            else:
+                total[0] += r
+                total[1] += g
+                total[2] += b
+
+    pixels = small.width() * small.height()
+    return [
+        (tuple(c // n for c in sums[key]), n / pixels)
+        for key, n in buckets.most_common(count)
+    ]
+
+
+def format_palette(colors):
+    """Serialize a palette as 'rrggbb:share' pairs, e.g. '#1e1e2e:0.41,#89b4fa:0.12'"""
+    return ",".join(f"#{r:02x}{g:02x}{b:02x}:{share:.2f}" for (r, g, b), share in colors)
+
+
+def parse_palette(text):
+    """Inverse of format_palette (entries without a share get an equal one)"""
+    colors = []
+    entries = [e for e in text.split(",") if e]
+    for entry in entries:
+        value, _, share = entry.partition(":")
+        try:
+            rgb = int(value.lstrip("#"), 16)
+            share = float(share) if share else 1 / len(entries)
+        except ValueError:
+            continue
+        colors.append((((rgb >> 16) & 255, (rgb >> 8) & 255, rgb & 255), share))
+    return colors
+
+
+def dominant_colors(image, count=PALETTE_SIZE):
+    """Palette of a thumbnail, serialized by format_palette"""
+    return format_palette(palette(image, count))
+
+
+def brightness(colors):
+    """Mean luma of a palette, 0-100"""
+    total = sum(share for _, share in colors)
+    if not total:
+        return 0.0
+    luma = sum((0.299 * r + 0.587 * g + 0.114 * b) * share for (r, g, b), share in colors)
+    return luma / total / 2.55
+
+
+def dominant_hue(colors, min_saturation=0.2, min_value=0.15):
+    """Hue in degrees of the largest clearly colored palette entry, None if grayscale"""
+    for (r, g, b), _share in colors:
+        h, s, v = colorsys.rgb_to_hsv(r / 255, g / 255, b / 255)
+        if s >= min_saturation and v >= min_value:
+            return h * 360
+    return None
+
+
+def color_distance(a, b):
+    """Perceptually weighted ('redmean') RGB distance, 0 to ~765"""
+    mean_r = (a[0] + b[0]) / 2
+    dr, dg, db = a[0] - b[0], a[1] - b[1], a[2] - b[2]
+    return (
+        (2 + mean_r / 256) * dr * dr + 4 * dg * dg + (2 + (255 - mean_r) / 256) * db * db
+    ) ** 0.5
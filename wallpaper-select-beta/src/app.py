@@ -1,35 +1,59 @@
 import os
 import json
-import subprocess
-import shlex
 from pathlib import Path
 
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QMessageBox, QScrollArea, QLineEdit
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QMessageBox, QLineEdit
 )
-from PySide6.QtGui import QFont, QKeyEvent
+from PySide6.QtGui import QFont, QKeyEvent, QPixmap
 from PySide6.QtCore import Qt, QTimer
 
-from widgets import FlexGridWidget, ClickableLabel
-from image_loader import ImageLoader
+import tracing
+from widgets import FlexGridWidget
+from catalog import Catalog, LOADED, FAILED
+from scheduler import ThumbnailScheduler
+from library_watcher import LibraryWatcher
+from scanner import LibraryScanner, in_library
+from library_index import LibraryIndex
+from wal_colors import WalColors
+from video_converter import VideoConverter
+from apply_pipeline import ApplyPipeline
+from previews import AnimatedPreview
+from perf_overlay import PerfOverlay
+from image_loader import ThumbnailLoader
+from decoders import DecoderChain, source_size
+from thumbnail_cache import ThumbnailCache
+from thumbnail_atlas import ThumbnailAtlas
+
+
+SUPPORTED_FORMATS = {".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tiff", ".tif", ".gif", ".mp4"}
+
+APPLY_STAGE_LABELS = {
+    "convert": "Converting",
+    "set": "Setting",
+    "palette": "Generating colors",
+    "hook": "Running pywal_script",
+}
+
+
+def format_ms(ms):
+    return f"{ms / 1000:.1f} s" if ms >= 1000 else f"{ms:.0f} ms"
 
 
 class WallpaperApp(QWidget):
     def __init__(self, config_path, pywal_enabled=False):
         super().__init__()
         self.pywal_enabled = pywal_enabled
+        self.daemon_mode = False  # set by daemon.DaemonServer: closing only hides the window
         self.setWindowTitle("Huegen - GUI")
         self.setGeometry(200, 100, 700, 450)
 
-        self.image_loader = None
         self.thumbnail_size = 180
-        self.all_image_files = []
-        self.next_image_index = 0
+        self.catalog = Catalog()
         self.batch_size = 16
-        self.loading_batch = False
 
         config = self.load_config(config_path)
-        if "wallpaper_dir" not in config:
+        if "wallpaper_dir" not in config and not config.get("wallpaper_dirs"):
             QMessageBox.critical(self, "Critical Error", "Missing 'wallpaper_dir' in config")
             raise SystemExit(1)
 
@@ -38,8 +62,13 @@ class WallpaperApp(QWidget):
         else:
              self.webp_output_fps = config["webp_output_fps"]
         
-        self.wallpaper_dir = config["wallpaper_dir"]
-
+        self.wallpaper_dirs = [
+            os.path.abspath(os.path.expanduser(d))
+            for d in config.get("wallpaper_dirs") or [config["wallpaper_dir"]]
+        ]
+        self.scan_exclude = config.get("exclude", [])
+        self.scan_max_depth = config.get("max_depth")
+        self.scanner = None
 
         if "wallpaper_command" not in config:
             QMessageBox.critical(self, "Critical Error", "Missing 'wallpaper_command' in config")
@@ -53,6 +82,89 @@ class WallpaperApp(QWidget):
             self.pywal_script = config["pywal_script"]
         else:
             self.pywal_script = None
+        self.pywal_precompute = config.get("pywal_precompute", False)
+
+        cache_mb = config.get("thumbnail_cache_mb", 512)
+        cache_dir = config.get("thumbnail_cache_dir")
+        if cache_dir:
+            cache_dir = os.path.expanduser(cache_dir)
+        self.thumbnail_cache = ThumbnailCache(
+            self.thumbnail_size, cache_dir=cache_dir, max_bytes=int(cache_mb * 1024 * 1024)
+        )
+        # Raw thumbnails mapped into memory, so a warm start decodes nothing
+        self.thumbnail_atlas = None
+        atlas_mb = config.get("thumbnail_atlas_mb", 256)
+        if atlas_mb:
+            try:
+                self.thumbnail_atlas = ThumbnailAtlas(
+                    self.thumbnail_size,
+                    cache_dir=os.path.join(cache_dir, "atlas") if cache_dir else None,
+                    max_bytes=int(atlas_mb * 1024 * 1024),
+                )
+            except Exception as e:
+                print(f"Thumbnail atlas disabled: {e}")
+
+        self.decoders = DecoderChain(config.get("decoders"))
+        self.image_loader = ThumbnailLoader(
+            self.thumbnail_size,
+            self.thumbnail_cache,
+            workers=config.get("workers"),
+            decoders=self.decoders,
+            thumbnail_atlas=self.thumbnail_atlas,
+            parent=self,
+        )
+        self.video_converter = VideoConverter(
+            fps=self.webp_output_fps, width=config.get("webp_output_width", 1920), parent=self
+        )
+        self.video_converter.progress.connect(self.on_conversion_progress)
+        self.video_converter.failed.connect(self.on_conversion_failed)
+        self.webp_preconvert = config.get("webp_preconvert", False)
+
+        self.wal_colors = None
+        if self.pywal_enabled:
+            self.wal_colors = WalColors(decoders=self.decoders, light=config.get("pywal_light", False))
+        self.apply_pipeline = ApplyPipeline(
+            self.wallpaper_command,
+            self.video_converter,
+            wal_colors=self.wal_colors,
+            hook=self.pywal_script if self.wal_colors is not None else None,
+            timeouts=config.get("apply_timeouts"),
+            resident=config.get("wallpaper_command_resident"),
+            parent=self,
+        )
+        self.apply_pipeline.stage_started.connect(self.on_apply_stage_started)
+        self.apply_pipeline.finished.connect(self.on_apply_finished)
+        self.image_loader.image_loaded.connect(self.on_image_loaded)
+        self.image_loader.image_failed.connect(self.on_image_failed)
+        self.image_loader.image_rendered.connect(self.on_image_rendered)
+        self.image_loader.finished.connect(self.on_loading_finished)
+        # Prefetch at least two jobs per worker so the pool never runs dry
+        self.batch_size = max(self.batch_size, self.image_loader.workers * 2)
+        self.background_fill = config.get("background_fill", True)
+        self.animated_previews = config.get("animated_previews", False)
+        self.preview_memory_mb = config.get("preview_memory_mb", 64)
+        self.preview_fps = config.get("preview_fps", 12)
+        self.pixmap_cache_mb = config.get("pixmap_cache_mb", 128)
+        self.perf_overlay_enabled = config.get("perf_overlay", False)
+
+        self.library_watcher = LibraryWatcher(
+            self.catalog, SUPPORTED_FORMATS, self.scan_exclude, self.scan_max_depth, parent=self
+        )
+        self.library_watcher.changes_ready.connect(self.apply_library_changes)
+
+        # Metadata of the last session, so the grid is filled before the scan ends
+        self.library_index = None
+        index_path = config.get("library_index", "")
+        if index_path is not False:
+            try:
+                self.library_index = LibraryIndex(os.path.expanduser(index_path) if index_path else None)
+            except Exception as e:
+                print(f"Library index disabled: {e}")
+        self.scan_seen = set()
+        self.index_timer = QTimer(self)
+        self.index_timer.setInterval(1000)
+        self.index_timer.timeout.connect(self.flush_library_index)
+
         self.setup_ui()
         self.apply_styles()
 
@@ -118,23 +230,44 @@ class WallpaperApp(QWidget):
 
         layout.addLayout(header_layout)
 
-        self.scroll = QScrollArea(self)
-        self.scroll.setWidgetResizable(True)
-        self.scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.scroll.setStyleSheet(
+        self.grid_widget = FlexGridWidget(self.catalog, self.thumbnail_size)
+        self.grid_widget.setStyleSheet(
             """
-            QScrollArea {
+            QAbstractScrollArea {
                 border: none;
                 background-color: transparent;
             }
             """
         )
-
-        self.grid_widget = FlexGridWidget()
-        self.scroll.setWidget(self.grid_widget)
-        layout.addWidget(self.scroll)
-        self.scroll.verticalScrollBar().valueChanged.connect(self.on_scroll)
+        # Minimum number of thumbnails loaded ahead of the viewport
+        self.grid_widget.prefetch = self.batch_size
+        self.grid_widget.pixmaps.budget_bytes = int(self.pixmap_cache_mb * 1024 * 1024)
+        self.grid_widget.activated.connect(self.execute_wallpaper_command)
+        self.grid_widget.render_requested.connect(self.render_thumbnails)
+        if self.animated_previews:
+            self.grid_widget.set_preview(
+                AnimatedPreview(
+                    self.catalog,
+                    self.thumbnail_size,
+                    budget_bytes=int(self.preview_memory_mb * 1024 * 1024),
+                    max_fps=self.preview_fps,
+                    parent=self,
+                )
+            )
+        layout.addWidget(self.grid_widget)
+
+        self.scheduler = ThumbnailScheduler(
+            self.catalog,
+            self.grid_widget,
+            self.image_loader,
+            background_fill=self.background_fill,
+            parent=self,
+        )
+        # Debug metrics over the grid, toggled with F12
+        self.perf_overlay = PerfOverlay(
+            self.grid_widget, self.image_loader, self.scheduler, self.thumbnail_cache
+        )
+        self.perf_overlay.setVisible(self.perf_overlay_enabled)
 
         self.setMinimumSize(800, 600)
 
@@ -205,130 +338,233 @@ class WallpaperApp(QWidget):
             raise SystemExit(1)
 
     def load_images_async(self):
-        if not os.path.isdir(self.wallpaper_dir):
-            QMessageBox.critical(self, "Error", f"Invalid wallpaper directory: {self.wallpaper_dir}")
+        roots = [d for d in self.wallpaper_dirs if os.path.isdir(d)]
+        if not roots:
+            QMessageBox.critical(self, "Error", f"Invalid wallpaper directory: {', '.join(self.wallpaper_dirs)}")
             raise SystemExit(1)
 
-        supported_formats = {".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tiff", ".tif", ".gif", ".webp", ".mp4"}
-        image_files = []
-
-        try:
-            for file in os.listdir(self.wallpaper_dir):
-                if Path(file).suffix.lower() in supported_formats:
-                    image_files.append(os.path.join(self.wallpaper_dir, file))
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error reading directory: {e}")
+        if self.scanner and self.scanner.isRunning():
+            self.scanner.stop()
+            self.scanner.wait()
+        self.library_watcher.clear()
+        self.catalog.clear()
+        self.scheduler.reset()
+        self.grid_widget.set_entries([])
+        self.scan_seen = set()
+        self.restore_library_index(roots)
+        self.status_label.setText("Scanning...")
+
+        self.scanner = LibraryScanner(roots, SUPPORTED_FORMATS, self.scan_exclude, self.scan_max_depth)
+        self.scanner.files_found.connect(self.on_files_found)
+        self.scanner.directory_scanned.connect(self.library_watcher.watch)
+        self.scanner.finished.connect(self.on_scan_finished)
+        self.scanner.start()
+        if self.library_index:
+            self.index_timer.start()
+
+    def restore_library_index(self, roots):
+        """Fill the catalog and grid from the library index of the last run"""
+        if not self.library_index:
             return
-
-        if not image_files:
-            self.status_label.setText("No images found")
+        catalog = self.catalog
+        entry_ids = []
+        for path, mtime, size, width, height, _fmt, colors, phash in self.library_index.load_all():
+            if not in_library(path, roots, SUPPORTED_FORMATS, self.scan_exclude, self.scan_max_depth):
+                continue
+            entry_id = catalog.add(path, size, mtime)
+            if width:
+                catalog.set_dimensions(entry_id, width, height)
+            catalog.set_analysis(entry_id, colors, phash)
+            entry_ids.append(entry_id)
+        if entry_ids:
+            self.grid_widget.set_entries(entry_ids)
+            print(f"Restored {len(entry_ids)} wallpapers from the library index")
+
+    def flush_library_index(self):
+        if self.library_index:
+            self.library_index.flush()
+
+    @tracing.traced("scan.files_found")
+    def on_files_found(self, entries):
+        """Reconcile a batch of (path, size, mtime) from the scanner with the catalog"""
+        catalog = self.catalog
+        added_ids = []
+        changed_ids = []
+        for path, size, mtime in entries:
+            self.scan_seen.add(path)
+            entry_id = catalog.id_of(path)
+            if entry_id is None:
+                added_ids.append(catalog.add(path, size, mtime))
+            elif size == catalog.sizes[entry_id] and int(mtime) == int(catalog.mtimes[entry_id]):
+                continue
+            else:
+                # Changed since the index was written
+                catalog.set_file_info(entry_id, size, mtime)
+                catalog.reset_metadata(entry_id)
+                changed_ids.append(entry_id)
+            if self.library_index:
+                self.library_index.record(path, mtime, size, fmt=Path(path).suffix.lower()[1:])
+        if added_ids:
+            self.grid_widget.apply_changes(added_ids, [])
+        if changed_ids:
+            self.grid_widget.invalidate(changed_ids)
+        self.status_label.setText(f"Loaded {self.catalog.loaded_count}/{len(self.catalog)}")
+
+    def on_scan_finished(self):
+        if self.scanner.should_stop:
             return
+        # Indexed wallpapers the scan did not find were deleted while we were closed
+        stale = [p for p in self.catalog.path_index if p not in self.scan_seen]
+        if stale:
+            self.apply_library_changes([], stale, [])
+        self.scan_seen = set()
+        if self.thumbnail_atlas is not None:
+            # Drop tiles of deleted/replaced wallpapers, first screen first
+            paths = self.catalog.paths
+            self.thumbnail_atlas.compact_async(paths[entry_id] for entry_id in self.grid_widget.entry_ids)
+        if self.webp_preconvert:
+            self.video_converter.precompute(
+                sorted(p for p in self.catalog.path_index if p.lower().endswith(".mp4"))
+            )
+        if self.wal_colors and self.pywal_precompute:
+            self.wal_colors.precompute(sorted(self.catalog.path_index))
+        if not len(self.catalog):
+            self.status_label.setText("No images found")
+        else:
+            self.on_loading_finished()
 
-        image_files.sort()
-        self.all_image_files = image_files
-        self.next_image_index = 0
-        self.loading_batch = False
-
-        total_count = len(self.all_image_files)
-        self.status_label.setText(f"Loading 0/{total_count}")
-        self.load_next_batch()
-
-    def create_placeholder_labels(self, image_files):
-        for img_path in image_files:
-            label = ClickableLabel(img_path, self.thumbnail_size)
-            self.grid_widget.add_image_label(label)
-
-        QTimer.singleShot(50, self.grid_widget.layout_items)
-
-    def load_next_batch(self):
-        if self.loading_batch:
+    @tracing.traced("thumbnail.delivered")
+    def on_image_loaded(self, image_path, image, rendered):
+        entry_id = self.catalog.id_of(image_path)
+        if entry_id is None:
             return
-        if self.next_image_index >= len(self.all_image_files):
-            return
-        self.loading_batch = True
-        end = min(len(self.all_image_files), self.next_image_index + self.batch_size)
-        batch = self.all_image_files[self.next_image_index:end]
-        self.next_image_index = end
-        self.create_placeholder_labels(batch)
-        self.image_loader = ImageLoader(batch, self.thumbnail_size)
-        self.image_loader.image_loaded.connect(self.on_image_loaded)
-        self.image_loader.finished.connect(self.on_loading_finished)
-        self.image_loader.start()
-
-    def on_image_loaded(self, image_path, pixmap):
-        for label in self.grid_widget.image_labels:
-            if label.image_path == image_path:
-                label.set_loaded_pixmap(pixmap)
-                break
+        self.catalog.set_state(entry_id, LOADED)
+        width, height = source_size(image)
+        if width:
+            self.catalog.set_dimensions(entry_id, width, height)
+        try:
+            self.catalog.set_file_info(
+                entry_id, int(image.text("Thumb::Size")), float(image.text("Thumb::MTime"))
+            )
+        except ValueError:
+            pass
+        colors = image.text("X-Huegen-Colors")
+        phash = image.text("X-Huegen-PHash")
+        self.catalog.set_analysis(entry_id, colors, phash)
+        self.grid_widget.metadata_changed(entry_id)
+        self.grid_widget.set_thumbnail(
+            entry_id, image, None if rendered.isNull() else QPixmap.fromImage(rendered)
+        )
+        if self.library_index:
+            self.library_index.record(
+                image_path,
+                self.catalog.mtimes[entry_id],
+                self.catalog.sizes[entry_id],
+                self.catalog.widths[entry_id],
+                self.catalog.heights[entry_id],
+                Path(image_path).suffix.lower()[1:],
+                colors,
+                phash,
+            )
+
+        self.status_label.setText(f"Loaded {self.catalog.loaded_count}/{len(self.catalog)}")
+        self.update_memory_tooltip()
+
+    def update_memory_tooltip(self):
+        """Show how much memory the in-memory thumbnails take on the status label"""
+        pixmaps = self.grid_widget.pixmaps
+        text = (
+            f"Thumbnails in memory: {len(pixmaps)} "
+            f"({pixmaps.resident_bytes / 1048576:.1f} of {pixmaps.budget_bytes / 1048576:.0f} MB)"
+        )
+        preview = self.grid_widget.preview
+        if preview:
+            text += f"\nPreview frames: {preview.resident_bytes / 1048576:.1f} of {preview.budget_bytes / 1048576:.0f} MB"
+        self.status_label.setToolTip(text)
+        tracing.counter("grid.pixmap_bytes", pixmaps.resident_bytes)
+
+    def render_thumbnails(self, entry_ids):
+        """Have the workers render thumbnails at the grid's (new) cell size"""
+        grid = self.grid_widget
+        self.image_loader.set_render_size(*grid.render_size())
+        paths = self.catalog.paths
+        self.image_loader.render(
+            (paths[entry_id], grid.pixmaps.get(entry_id)) for entry_id in entry_ids if entry_id in grid.pixmaps
+        )
 
-        loaded_count = sum(1 for label in self.grid_widget.image_labels if label.loaded)
-        total_count = len(self.all_image_files) or len(self.grid_widget.image_labels)
-        self.status_label.setText(f"Loaded {loaded_count}/{total_count}")
+    def on_image_rendered(self, image_path, rendered):
+        entry_id = self.catalog.id_of(image_path)
+        if entry_id is not None:
+            self.grid_widget.set_rendered(entry_id, QPixmap.fromImage(rendered))
+
+    def on_image_failed(self, image_path):
+        entry_id = self.catalog.id_of(image_path)
+        if entry_id is not None:
+            self.catalog.set_state(entry_id, FAILED)
+            self.grid_widget.update_cell(self.grid_widget.position_of(entry_id))
+
+    def apply_library_changes(self, added, removed, modified):
+        """Apply a batch of filesystem changes without rescanning the library"""
+        removed_ids = [self.catalog.id_of(p) for p in removed if p in self.catalog]
+        for entry_id in removed_ids:
+            self.catalog.remove(entry_id)
+        if self.library_index:
+            self.library_index.remove(removed)
+        added_ids = [self.catalog.add(p) for p in added]
+        self.grid_widget.apply_changes(added_ids, removed_ids)
+
+        modified_ids = [self.catalog.id_of(p) for p in modified if p in self.catalog]
+        for entry_id in modified_ids:
+            self.catalog.reset_metadata(entry_id)
+        self.grid_widget.invalidate(modified_ids)
+
+        print(f"Library changed: +{len(added_ids)} -{len(removed_ids)} ~{len(modified_ids)}")
+        self.on_loading_finished()
 
     def on_loading_finished(self):
-        self.loading_batch = False
-        loaded_count = sum(1 for label in self.grid_widget.image_labels if label.loaded)
-        total_count = len(self.all_image_files) or len(self.grid_widget.image_labels)
+        loaded_count = self.catalog.loaded_count
+        total_count = len(self.catalog)
         if total_count == 0:
             self.status_label.setText("No images loaded")
-        elif loaded_count == total_count and self.next_image_index >= len(self.all_image_files):
+        elif self.search_input.text().strip():
+            self.status_label.setText(f"Showing {self.catalog.visible_count}/{total_count}")
+        elif loaded_count == total_count:
             self.status_label.setText(f"{loaded_count} images")
         else:
             self.status_label.setText(f"Loaded {loaded_count}/{total_count}")
 
-        if self.grid_widget.image_labels and self.grid_widget.selected_index == -1:
-            for idx, lbl in enumerate(self.grid_widget.image_labels):
-                if lbl.isVisible():
-                    self.grid_widget.select_item(idx)
-                    break
-
-        QTimer.singleShot(0, self.maybe_load_more)
-
-        self.apply_search_filter()
+        if self.grid_widget.items and self.grid_widget.selected_index == -1:
+            self.grid_widget.select_item(0)
 
+    @tracing.traced("apply.execute")
     def execute_wallpaper_command(self, image_path):
-        try:
-            command = self.wallpaper_command.replace("{path}", image_path)
-            command = command.replace("<selected image path>", image_path)
-
-            filename = os.path.basename(image_path)
-            ext = Path(filename).suffix.lower()
-
-            if ext == ".mp4":
-                webp_path = str(Path(image_path).parent / (Path(image_path).stem + ".webp"))
-                subprocess.Popen(
-                    f'ffmpeg -y -i "{image_path}" -vf "fps={self.webp_output_fps},scale=1920:-1:flags=lanczos" -loop 0 -c libwebp -quality 85 "{webp_path}"',
-                    shell=True
-                )
-                command = self.wallpaper_command.replace(image_path, webp_path)
-                image_path = webp_path  # for pywal
-
-            self.status_label.setText(f"Setting: {filename}")
-
-            if os.name == 'nt':
-                subprocess.Popen(command, shell=True)
-            else:
-                try:
-                    args = shlex.split(command)
-                    subprocess.Popen(args)
-                except ValueError:
-                    subprocess.Popen(command, shell=True)
-
-            # Run pywal if enabled
-            if getattr(self, "pywal_enabled", False) and self.pywal_script != None:
-                subprocess.Popen(f"wal -i '{image_path}' -o {self.pywal_script}", shell=True)
-            else: 
-                print("Pywal script not set in config or not included, skipping pywal execution.")
-
-            self.status_label.setText(f"✓ Set: {filename}")
-            print(f"Successfully set wallpaper: {image_path}")
-
-        except FileNotFoundError:
-            self.status_label.setText("✗ Command not found")
-            print(f"Command not found: {self.wallpaper_command}")
-        except Exception as e:
-            self.status_label.setText(f"✗ Error: {str(e)[:20]}...")
-            print(f"Error executing command: {e}")
+        """Queue image_path for the apply pipeline; an apply still running is superseded"""
+        self.apply_pipeline.apply(image_path)
+
+    def on_apply_stage_started(self, source, stage):
+        self.status_label.setText(f"{APPLY_STAGE_LABELS[stage]}: {os.path.basename(source)}")
+
+    def on_conversion_progress(self, source, fraction):
+        if source == self.apply_pipeline.current and self.apply_pipeline.stage == "convert":
+            self.status_label.setText(f"Converting: {os.path.basename(source)} {fraction:.0%}")
+
+    def on_conversion_failed(self, source, error):
+        print(f"Could not convert {source}: {error}")
+
+    def on_apply_finished(self, source, results):
+        """Show how each stage of an apply went, with its latency"""
+        filename = os.path.basename(source)
+        timings = ", ".join(f"{stage} {format_ms(ms)}" for stage, _outcome, ms, _detail in results)
+        stage, outcome, ms, detail = results[-1] if results else ("set", "failed", 0.0, "")
+        if outcome == "cancelled":
+            print(f"Superseded: {source} ({timings})")
+            return  # the newer selection reports its own status
+        if outcome == "ok":
+            self.status_label.setText(f"✓ Set: {filename} ({timings})")
+            print(f"Successfully set wallpaper: {source} ({timings})")
+            return
+        self.status_label.setText(f"✗ {stage} {outcome}: {filename}" + (f" ({detail})" if detail else ""))
+        print(f"Could not set wallpaper {source}: {stage} {outcome} after {format_ms(ms)}: {detail or '-'}")
 
     def show_command_info(self):
         QMessageBox.information(
@@ -339,11 +575,19 @@ class WallpaperApp(QWidget):
             "• {path} or <selected image path> will be replaced with the image path\n\n"
             "Keyboard Navigation:\n"
             "• Arrow keys to navigate\n"
-            "• Enter/Space to select wallpaper",
+            "• Page Up/Down, Home/End to jump\n"
+            "• Enter/Space to select wallpaper\n"
+            "• F12 to toggle the performance overlay",
         )
 
     def keyPressEvent(self, event: QKeyEvent):
         key = event.key()
+        if key == Qt.Key_F12:
+            self.perf_overlay.toggle()
+            return
+        if key == Qt.Key_Escape and self.daemon_mode:
+            self.hide()
+            return
         modifiers = event.modifiers()
         is_ctrl = bool(modifiers & (Qt.ControlModifier | Qt.MetaModifier))
         printable = (32 <= key <= 126) and not is_ctrl
@@ -358,24 +602,13 @@ class WallpaperApp(QWidget):
 
         self.grid_widget.keyPressEvent(event)
 
-    def on_scroll(self, _value: int):
-        self.maybe_load_more()
-
-    def maybe_load_more(self):
-        sb = self.scroll.verticalScrollBar()
-        if not sb:
-            return
-        near_bottom = (sb.maximum() - sb.value()) <= max(100, sb.pageStep() // 2)
-        if near_bottom:
-            self.load_next_batch()
-
     def on_search_text_changed(self, _text: str):
         self.search_timer.start(120)
 
     def apply_search_filter(self):
         text = self.search_input.text() if hasattr(self, 'search_input') else ""
         visible = self.grid_widget.filter_by_text(text)
-        total = len(self.grid_widget.image_labels)
+        total = len(self.catalog)
         if total:
             self.status_label.setText(f"Showing {visible}/{total}")
 
@@ -383,9 +616,27 @@ class WallpaperApp(QWidget):
         super().resizeEvent(event)
 
     def closeEvent(self, event):
-        if self.image_loader and self.image_loader.isRunning():
+        if self.daemon_mode:
+            # Stay resident with everything loaded, the next show is instant
+            event.ignore()
+            self.hide()
+            return
+        if self.scanner and self.scanner.isRunning():
+            self.scanner.stop()
+            self.scanner.wait(1000)
+        if self.image_loader.is_busy():
             self.image_loader.stop()
             self.image_loader.wait(1000)
+        self.apply_pipeline.stop()
+        self.video_converter.stop()
+        if self.grid_widget.preview:
+            self.grid_widget.preview.stop()
+        if self.wal_colors:
+            self.wal_colors.stop()
+        if self.thumbnail_atlas is not None:
+            self.thumbnail_atlas.close()
+        if self.library_index:
+            self.index_timer.stop()
+            self.library_index.close()
+            self.library_index = None
         event.accept()
-
-
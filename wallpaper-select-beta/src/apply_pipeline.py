@@ -0,0 +1,418 @@
+import os
+import shlex
+import signal
+import time
+
+from PySide6.QtCore import QObject, QProcess, QRunnable, QTimer, Signal
+
+import tracing
+from thumbnail_cache import default_cache_root
+
+
+DEFAULT_TIMEOUTS = {"convert": 600, "set": 10, "palette": 30, "hook": 30}  # seconds
+
+# Wallpaper tools that keep running to show the wallpaper. Once one of them
+# survived RESIDENT_GRACE seconds it is taken as set and left running.
+RESIDENT_TOOLS = ("swaybg", "mpvpaper", "wbg", "glpaper", "oguri", "xwinwrap")
+RESIDENT_GRACE = 0.75
+
+# The wallpaper command runs in the background of a shell that reports its
+# pid and waits for its exit status. Killing the shell leaves the command
+# running, so a resident wallpaper process (swaybg) outlives the picker.
+# Its output goes to a log file ($1) instead of a pipe that closes with us.
+SET_WRAPPER = 'log=$1; shift; "$@" </dev/null >/dev/null 2>"$log" & echo $!; wait $!'
+
+
+def command_args(command):
+    """Split a command line into (program, arguments); unparsable lines go through a shell"""
+    if os.name == "nt":
+        return "cmd", ["/c", command]
+    try:
+        args = shlex.split(command)
+    except ValueError:
+        return "/bin/sh", ["-c", command]
+    if not args:
+        return None, []
+    return args[0], args[1:]
+
+
+def process_start_time(pid):
+    """Start time of pid in clock ticks since boot (Linux), None if unknown"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            return int(f.read().rsplit(b")", 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def last_line(data):
+    lines = data.decode(errors="replace").strip().splitlines()
+    return lines[-1].strip()[:200] if lines else ""
+
+
+class PaletteJob(QRunnable):
+    """Generate the colorscheme of a wallpaper on the WalColors pool"""
+
+    def __init__(self, pipeline, run_id, source, wallpaper):
+        super().__init__()
+        self.pipeline = pipeline
+        self.run_id = run_id
+        self.source = source
+        self.wallpaper = wallpaper
+
+    def run(self):
+        scheme = None
+        try:
+            scheme = self.pipeline.wal_colors.scheme(self.source, wallpaper=self.wallpaper)
+        except Exception as e:
+            print(f"Error generating colorscheme for {self.source}: {e}")
+        try:
+            self.pipeline._palette_done.emit(self.run_id, scheme)
+        except RuntimeError:
+            pass  # pipeline was destroyed while this job ran
+
+
+class ApplyPipeline(QObject):
+    """Applies wallpapers one at a time: convert -> set -> palette -> hook.
+
+    Only the newest request is kept; finished reports (stage, outcome, ms, detail) per stage.
+    """
+    stage_started = Signal(str, str)  # source, stage
+    finished = Signal(str, list)  # source, [(stage, outcome, ms, detail)]
+
+    _palette_done = Signal(int, object)
+
+    def __init__(
+        self, wallpaper_command, video_converter, wal_colors=None, hook=None, timeouts=None, resident=None, parent=None
+    ):
+        super().__init__(parent)
+        self.wallpaper_command = wallpaper_command
+        self.resident = resident  # None: decided by the program name (RESIDENT_TOOLS)
+        self.converter = video_converter
+        self.wal_colors = wal_colors
+        self.hook = os.path.expanduser(hook) if hook else None
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.log_path = os.path.join(default_cache_root(), "wallpaper-command.log")
+
+        self.latest = None  # newest request, started when the current run is done
+        self.current = None  # source being applied
+        self.wallpaper = None  # file handed to the wallpaper command (the WebP of an MP4)
+        self.stage = None
+        self.results = []
+        self.process = None
+        self.tool_pid = 0  # wallpaper command of the current set stage
+        self.resident_process = None  # (pid, pidfd, start time) of the command left running by an earlier apply
+        self._run_id = 0
+        self._abort = None
+        self._stage_started = 0.0
+        self._trace_start = 0
+        self._stderr = b""
+
+        # Requests within one event loop pass collapse into the last one
+        self.start_timer = QTimer(self)
+        self.start_timer.setSingleShot(True)
+        self.start_timer.setInterval(0)
+        self.start_timer.timeout.connect(self._start_next)
+        self.timeout_timer = QTimer(self)
+        self.timeout_timer.setSingleShot(True)
+        self.timeout_timer.timeout.connect(self._on_timeout)
+        self.resident_timer = QTimer(self)
+        self.resident_timer.setSingleShot(True)
+        self.resident_timer.timeout.connect(self._on_resident)
+
+        video_converter.converted.connect(self._on_converted)
+        video_converter.failed.connect(self._on_convert_failed)
+        self._palette_done.connect(self._on_palette_done)
+
+        try:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        except OSError as e:
+            print(f"Could not create {os.path.dirname(self.log_path)}: {e}")
+
+    def is_busy(self):
+        return self.current is not None or self.latest is not None
+
+    def apply(self, source):
+        """Apply source once whatever runs now is done; superseded requests are dropped"""
+        self.latest = source
+        if self.wal_colors is not None:
+            self.wal_colors.pause_precompute(True)
+        if self.current is None:
+            self.start_timer.start()
+        elif self._abort is None:
+            self._cancel("cancelled")
+
+    def stop(self):
+        """Drop queued requests and end the current run (a running wallpaper command is kept)"""
+        self.latest = None
+        self.start_timer.stop()
+        if self.stage == "set" and self.process is not None:
+            self._release(self.process)
+            self.process = None
+            self._end("cancelled")
+            self._finish()
+        elif self.current is not None and self._abort is None:
+            self._cancel("cancelled")
+        elif self.current is None and self.wal_colors is not None:
+            self.wal_colors.pause_precompute(False)
+
+    # Stages
+
+    def _start_next(self):
+        if self.current is not None or self.latest is None:
+            return
+        source, self.latest = self.latest, None
+        self.current = source
+        self.results = []
+        self._run_id += 1
+        self._abort = None
+        if source.lower().endswith(".mp4"):
+            self._begin("convert")
+            output = self.converter.convert(source, urgent=True)
+            if output:
+                self._on_converted(source, output, "cached")
+        else:
+            self._set(source)
+
+    def _set(self, image_path):
+        self.wallpaper = image_path
+        command = self.wallpaper_command.replace("{path}", image_path)
+        command = command.replace("<selected image path>", image_path)
+        program, args = command_args(command)
+        self._begin("set")
+        if program is None:
+            self._end("failed", "empty wallpaper_command")
+            self._finish()
+            return
+        self.tool_pid = 0
+        resident = self.resident
+        if resident is None:
+            resident = os.path.basename(program) in RESIDENT_TOOLS
+        if os.name != "nt":
+            program, args = "/bin/sh", ["-c", SET_WRAPPER, "sh", self.log_path, program, *args]
+        self._start_process(program, args)
+        if resident:
+            self.resident_timer.start(int(RESIDENT_GRACE * 1000))
+
+    def _palette(self):
+        if self.wal_colors is None:
+            self._finish()
+            return
+        self._begin("palette")
+        self.wal_colors.apply_pool.start(PaletteJob(self, self._run_id, self.current, self.wallpaper))
+
+    def _run_hook(self):
+        if not self.hook:
+            self._finish()
+            return
+        self._begin("hook")
+        self._start_process(self.hook, [])
+
+    def _begin(self, stage):
+        self.stage = stage
+        self._stage_started = time.perf_counter()
+        self._trace_start = tracing.now()
+        timeout = self.timeouts.get(stage)
+        if timeout:
+            self.timeout_timer.start(int(timeout * 1000))
+        self.stage_started.emit(self.current, stage)
+
+    def _end(self, outcome, detail=""):
+        """Record the result of the current stage; True if the run goes on"""
+        self.timeout_timer.stop()
+        self.resident_timer.stop()
+        ms = (time.perf_counter() - self._stage_started) * 1000
+        tracing.add_span(f"apply.{self.stage}", self._trace_start, source=self.current, outcome=outcome)
+        self.results.append((self.stage, outcome, ms, detail))
+        self.stage = None
+        return outcome == "ok"
+
+    def _finish(self):
+        source, results = self.current, self.results
+        self.current = None
+        self.stage = None
+        self.process = None
+        self._abort = None
+        self.results = []
+        self.finished.emit(source, results)
+        if self.latest is not None:
+            self.start_timer.start()
+        elif self.wal_colors is not None:
+            self.wal_colors.pause_precompute(False)
+
+    def _cancel(self, outcome):
+        """End the current run early; processes are killed and report back when they exit"""
+        self._abort = outcome
+        stage = self.stage
+        if stage in ("set", "hook") and self.process is not None:
+            if stage == "set" and self.tool_pid:
+                self._signal(self.tool_pid, signal.SIGTERM)
+            self.process.kill()
+            return
+        if stage == "convert":
+            self.converter.cancel(self.current)
+        if stage is not None:
+            self._end(outcome)
+        self._finish()
+
+    def _on_resident(self):
+        """The wallpaper command outlived the grace period: a resident process (swaybg)"""
+        if self.stage != "set" or self._abort or self.process is None:
+            return
+        if self.process.state() == QProcess.NotRunning:
+            return  # exited just now, finished is on its way
+        # Keep it, it is replaced by the next apply. The shell has not reaped
+        # it yet, so tool_pid still names it while we take a handle
+        resident = self._process_handle(self.tool_pid) if self.tool_pid else None
+        self._release(self.process)
+        self.process = None
+        self._replace_resident(resident)
+        self._end("ok", "still running, left in the background")
+        self._palette()
+
+    def _on_timeout(self):
+        stage = self.stage
+        if stage in ("set", "hook") and self.process is not None:
+            self._abort = "timed out"
+            self.process.kill()
+            return
+        if stage == "convert":
+            self.converter.cancel(self.current)
+        self._run_id += 1  # a palette result arriving late is ignored
+        self._end("timed out", f"after {self.timeouts[stage]} s")
+        self._finish()
+
+    # Process stages (set, hook)
+
+    def _start_process(self, program, args):
+        process = QProcess(self)
+        process.setProgram(program)
+        process.setArguments(args)
+        process.readyReadStandardOutput.connect(lambda: self._on_stdout(process))
+        process.finished.connect(lambda code, status: self._on_process_finished(process, code, status))
+        process.errorOccurred.connect(lambda error: self._on_process_error(process, error))
+        self.process = process
+        self._stderr = b""
+        process.start()
+
+    def _on_stdout(self, process):
+        data = bytes(process.readAllStandardOutput())
+        if process is self.process and self.stage == "set" and not self.tool_pid:
+            try:
+                self.tool_pid = int(data.split(b"\n", 1)[0])
+            except ValueError:
+                pass
+
+    def _on_process_error(self, process, error):
+        if process is not self.process or error != QProcess.FailedToStart:
+            return  # other errors are followed by finished
+        self.process = None
+        process.deleteLater()
+        self._end("failed", f"could not start {process.program()}: {process.errorString()}")
+        self._finish()
+
+    def _on_process_finished(self, process, code, status):
+        process.deleteLater()
+        if process is not self.process:
+            return
+        self.process = None
+        stage = self.stage
+        self._stderr = bytes(process.readAllStandardError())
+        if self._abort:
+            self._end(self._abort, f"after {self.timeouts[stage]} s" if self._abort == "timed out" else "")
+            self._finish()
+            return
+        if status != QProcess.NormalExit:
+            ok = self._end("failed", "crashed")
+        elif code != 0:
+            ok = self._end("failed", self._error_detail(stage, code))
+        else:
+            ok = self._end("ok")
+        if not ok:
+            self._finish()
+        elif stage == "set":
+            self._replace_resident(None)
+            self._palette()
+        else:
+            self._finish()
+
+    def _error_detail(self, stage, code):
+        if stage == "set" and os.name != "nt":
+            try:
+                with open(self.log_path, "rb") as f:
+                    message = last_line(f.read())
+            except OSError:
+                message = ""
+            if code == 127 and not message:
+                message = "command not found"
+        else:
+            message = last_line(self._stderr)
+        return f"exit {code}" + (f": {message}" if message else "")
+
+    def _release(self, process):
+        """Stop tracking a running process; the wallpaper command behind the shell keeps running"""
+        process.readyReadStandardOutput.disconnect()
+        process.finished.disconnect()
+        process.errorOccurred.disconnect()
+        process.finished.connect(process.deleteLater)
+        if os.name != "nt":
+            process.kill()
+
+    @staticmethod
+    def _process_handle(pid):
+        """Identify pid so that a later signal can't hit a process that reused it"""
+        try:
+            return pid, os.pidfd_open(pid), None
+        except (AttributeError, OSError):  # no pidfds before Linux 5.3 / Python 3.9
+            return pid, None, process_start_time(pid)
+
+    def _replace_resident(self, resident):
+        """A new wallpaper is set: terminate the command left running by the previous one"""
+        if self.resident_process is not None:
+            pid, pidfd, started = self.resident_process
+            if pidfd is not None:
+                try:
+                    signal.pidfd_send_signal(pidfd, signal.SIGTERM)
+                except OSError:
+                    pass  # already gone
+                os.close(pidfd)
+            elif started is not None and process_start_time(pid) == started:
+                self._signal(pid, signal.SIGTERM)
+        self.resident_process = resident
+
+    @staticmethod
+    def _signal(pid, sig):
+        try:
+            os.kill(pid, sig)
+        except OSError:
+            pass
+
+    # Convert and palette stages
+
+    def _on_converted(self, source, output, detail=""):
+        if source != self.current or self.stage != "convert":
+            return
+        self._end("ok", detail)
+        self._set(output)
+
+    def _on_convert_failed(self, source, error):
+        if source != self.current or self.stage != "convert":
+            return
+        self._end("failed", error)
+        self._finish()
+
+    def _on_palette_done(self, run_id, scheme):
+        if run_id != self._run_id or self.stage != "palette":
+            return
+        if scheme is None:
+            self._end("failed", "could not extract colors")
+            self._finish()
+            return
+        try:
+            self.wal_colors.export(scheme)
+        except OSError as e:
+            self._end("failed", f"could not write colorscheme: {e}")
+            self._finish()
+            return
+        self._end("ok")
+        self._run_hook()
@@ -0,0 +1,122 @@
+import os
+from array import array
+
+UNLOADED = 0
+LOADED = 1
+FAILED = 2
+REMOVED = 3
+
+
+class Catalog:
+    """Central list of wallpapers shared by the loader, grid, search and status bar.
+
+    Fields are stored column-wise and addressed by integer id; removed slots are reused.
+    """
+
+    def __init__(self):
+        self.paths = []
+        self.sizes = array("q")
+        self.mtimes = array("d")
+        self.widths = array("i")
+        self.heights = array("i")
+        self.colors = []
+        self.phashes = []
+        self.states = bytearray()
+        self.path_index = {}
+        self._free_slots = []
+
+        self.loaded_count = 0
+        self.visible_count = 0
+
+    def __len__(self):
+        return len(self.path_index)
+
+    def capacity(self):
+        """Number of slots, i.e. one past the largest id ever handed out"""
+        return len(self.paths)
+
+    def __contains__(self, path):
+        return path in self.path_index
+
+    def id_of(self, path):
+        return self.path_index.get(path)
+
+    def add(self, path, size=0, mtime=0.0):
+        """Add path (if new) and return its id"""
+        entry_id = self.path_index.get(path)
+        if entry_id is not None:
+            return entry_id
+        if self._free_slots:
+            entry_id = self._free_slots.pop()
+            self.paths[entry_id] = path
+            self.sizes[entry_id] = size
+            self.mtimes[entry_id] = mtime
+            self.widths[entry_id] = 0
+            self.heights[entry_id] = 0
+            self.colors[entry_id] = ""
+            self.phashes[entry_id] = ""
+            self.states[entry_id] = UNLOADED
+        else:
+            entry_id = len(self.paths)
+            self.paths.append(path)
+            self.sizes.append(size)
+            self.mtimes.append(mtime)
+            self.widths.append(0)
+            self.heights.append(0)
+            self.colors.append("")
+            self.phashes.append("")
+            self.states.append(UNLOADED)
+        self.path_index[path] = entry_id
+        return entry_id
+
+    def remove(self, entry_id):
+        """Drop an entry and keep its slot for reuse"""
+        path = self.paths[entry_id]
+        if self.path_index.get(path) != entry_id:
+            return
+        self.set_state(entry_id, REMOVED)
+        del self.path_index[path]
+        self.colors[entry_id] = ""
+        self.phashes[entry_id] = ""
+        self._free_slots.append(entry_id)
+
+    def name(self, entry_id):
+        return os.path.basename(self.paths[entry_id])
+
+    def add_many(self, paths):
+        return [self.add(path) for path in paths]
+
+    def clear(self):
+        self.__init__()
+
+    def set_state(self, entry_id, state):
+        previous = self.states[entry_id]
+        if previous == state:
+            return
+        if previous == LOADED:
+            self.loaded_count -= 1
+        if state == LOADED:
+            self.loaded_count += 1
+        self.states[entry_id] = state
+
+    def is_loaded(self, entry_id):
+        return self.states[entry_id] == LOADED
+
+    def set_file_info(self, entry_id, size, mtime):
+        self.sizes[entry_id] = size
+        self.mtimes[entry_id] = mtime
+
+    def set_dimensions(self, entry_id, width, height):
+        self.widths[entry_id] = width
+        self.heights[entry_id] = height
+
+    def set_analysis(self, entry_id, colors, phash):
+        """colors is a comma separated '#rrggbb' list, phash a hex string"""
+        self.colors[entry_id] = colors
+        self.phashes[entry_id] = phash
+
+    def reset_metadata(self, entry_id):
+        """Forget everything derived from the file contents (it changed)"""
+        self.set_dimensions(entry_id, 0, 0)
+        self.set_analysis(entry_id, "", "")
+        self.set_state(entry_id, UNLOADED)
@@ -0,0 +1,38 @@
+import os
+import socket
+
+
+COMMANDS = ("show", "toggle", "hide", "quit", "ping")
+
+
+def socket_path():
+    """Where the daemon listens: $XDG_RUNTIME_DIR/huegen-gui.sock (or a per-user /tmp path)"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "huegen-gui.sock")
+    return f"/tmp/huegen-gui-{os.getuid()}.sock"
+
+
+def send_command(command, timeout=2.0):
+    """Send command to a running daemon; returns its reply, or None if no daemon is listening.
+
+    Only the standard library is used, so the client starts without
+    importing PySide6.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path())
+            sock.sendall(command.encode() + b"\n")
+            reply = b""
+            while not reply.endswith(b"\n"):
+                chunk = sock.recv(256)
+                if not chunk:
+                    break
+                reply += chunk
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    except OSError as e:
+        print(f"Could not reach huegen-gui daemon: {e}")
+        return None
+    return reply.decode(errors="replace").strip()
@@ -0,0 +1,75 @@
+from PySide6.QtCore import QObject, QTimer
+from PySide6.QtNetwork import QLocalServer
+from PySide6.QtWidgets import QApplication
+
+from client import COMMANDS, socket_path
+
+
+class DaemonServer(QObject):
+    """Keeps a WallpaperApp resident and shows/hides it on client commands.
+
+    Commands are single lines on a local socket (see client.py), each answered with 'ok'.
+    """
+
+    def __init__(self, window, parent=None):
+        super().__init__(parent)
+        self.window = window
+        self.path = socket_path()
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self._on_connection)
+
+    def listen(self):
+        """Start serving; a socket left behind by a crashed daemon is replaced"""
+        QLocalServer.removeServer(self.path)
+        if not self.server.listen(self.path):
+            print(f"Could not listen on {self.path}: {self.server.errorString()}")
+            return False
+        self.window.daemon_mode = True
+        QApplication.instance().setQuitOnLastWindowClosed(False)
+        return True
+
+    def close(self):
+        self.server.close()
+        QLocalServer.removeServer(self.path)
+
+    def show_window(self):
+        window = self.window
+        window.show()
+        window.raise_()
+        window.activateWindow()
+        window.grid_widget.setFocus()
+
+    def handle(self, command):
+        if command == "show":
+            self.show_window()
+        elif command == "toggle":
+            if self.window.isVisible():
+                self.window.hide()
+            else:
+                self.show_window()
+        elif command == "hide":
+            self.window.hide()
+        elif command == "quit":
+            QTimer.singleShot(0, self.quit)  # after the reply went out
+        return command in COMMANDS
+
+    def quit(self):
+        self.window.daemon_mode = False
+        self.window.close()
+        self.close()
+        QApplication.instance().quit()
+
+    def _on_connection(self):
+        while self.server.hasPendingConnections():
+            connection = self.server.nextPendingConnection()
+            connection.readyRead.connect(lambda c=connection: self._on_ready_read(c))
+            connection.disconnected.connect(connection.deleteLater)
+
+    def _on_ready_read(self, connection):
+        if not connection.canReadLine():
+            return
+        command = bytes(connection.readLine()).decode(errors="replace").strip()
+        reply = b"ok\n" if self.handle(command) else b"unknown command\n"
+        connection.write(reply)
+        connection.flush()
+        connection.disconnectFromServer()
@@ -0,0 +1,207 @@
+import time
+import shutil
+import subprocess
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from PySide6.QtCore import Qt, QSize
+from PySide6.QtGui import QImage, QImageReader
+
+import tracing
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional
+    Image = None
+
+
+def set_source_size(image, width, height):
+    """Record the full-size dimensions on a thumbnail (freedesktop keys)"""
+    image.setText("Thumb::Image::Width", str(width))
+    image.setText("Thumb::Image::Height", str(height))
+
+
+def source_size(image):
+    """Return the (width, height) recorded by set_source_size, or (0, 0)"""
+    try:
+        return int(image.text("Thumb::Image::Width")), int(image.text("Thumb::Image::Height"))
+    except ValueError:
+        return 0, 0
+
+
+class Decoder(ABC):
+    """Base class for thumbnail decoder backends"""
+    name = "base"
+
+    def available(self):
+        return True
+
+    @abstractmethod
+    def decode(self, path, size):
+        """Return a QImage that fits in size x size, or None if unsupported"""
+
+
+class QtDecoder(Decoder):
+    """QImageReader with setScaledSize, so JPEGs are DCT-scaled while decoding"""
+    name = "qt"
+
+    def decode(self, path, size):
+        reader = QImageReader(path)
+        source_size = reader.size()
+        if source_size.isValid() and (source_size.width() > size or source_size.height() > size):
+            reader.setScaledSize(source_size.scaled(QSize(size, size), Qt.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            return None
+        if source_size.isValid():
+            set_source_size(image, source_size.width(), source_size.height())
+        return image
+
+
+class PillowDecoder(Decoder):
+    """Pillow with draft() mode, which also decodes JPEGs at reduced scale"""
+    name = "pillow"
+
+    def available(self):
+        return Image is not None
+
+    def decode(self, path, size):
+        with Image.open(path) as img:
+            source_width, source_height = img.size
+            img.draft("RGB", (size, size))
+            img.thumbnail((size, size), Image.LANCZOS)
+            img = img.convert("RGBA")
+            data = img.tobytes()
+            image = QImage(data, img.width, img.height, img.width * 4, QImage.Format_RGBA8888)
+            # QImage does not own data, detach before it goes out of scope
+            image = image.copy()
+            set_source_size(image, source_width, source_height)
+            return image
+
+
+class FfmpegDecoder(Decoder):
+    """Grab a single representative frame of a video, scaled by ffmpeg itself.
+
+    ffprobe and ffmpeg share one timeout; only the keyframe at seek_fraction is decoded.
+    """
+    name = "ffmpeg"
+
+    def __init__(self, timeout=10, seek_fraction=0.1):
+        self.timeout = timeout
+        self.seek_fraction = seek_fraction
+        self.ffmpeg = shutil.which("ffmpeg")
+        self.ffprobe = shutil.which("ffprobe")
+
+    def available(self):
+        return self.ffmpeg is not None
+
+    def probe(self, path, timeout):
+        """Return (duration, width, height) of the first video stream, zeros if unknown"""
+        if self.ffprobe is None:
+            return 0.0, 0, 0
+        with tracing.span("decode.ffprobe"):
+            result = subprocess.run(
+                [
+                    self.ffprobe, "-v", "error",
+                    "-select_streams", "v:0",
+                    "-show_entries", "stream=width,height:format=duration",
+                    "-of", "default=noprint_wrappers=1",
+                    path,
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                timeout=timeout,
+            )
+        info = dict(
+            line.split("=", 1) for line in result.stdout.decode(errors="replace").splitlines() if "=" in line
+        )
+        try:
+            duration = float(info.get("duration", 0))
+        except ValueError:
+            duration = 0.0
+        try:
+            return duration, int(info.get("width", 0)), int(info.get("height", 0))
+        except ValueError:
+            return duration, 0, 0
+
+    def grab_frame(self, path, size, seek, timeout):
+        args = [self.ffmpeg, "-v", "error", "-nostdin", "-threads", "1", "-skip_frame", "nokey"]
+        if seek > 0:
+            args += ["-noaccurate_seek", "-ss", f"{seek:.3f}"]
+        args += [
+            "-i", path,
+            "-an", "-sn",
+            "-frames:v", "1",
+            "-vf", f"scale={size}:{size}:force_original_aspect_ratio=decrease",
+            "-f", "image2pipe", "-c:v", "png", "-",
+        ]
+        with tracing.span("decode.ffmpeg_frame"):
+            result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=timeout)
+        if result.returncode != 0 or not result.stdout:
+            return None
+        image = QImage.fromData(result.stdout, "PNG")
+        return None if image.isNull() else image
+
+    def decode(self, path, size):
+        deadline = time.monotonic() + self.timeout
+        duration, width, height = self.probe(path, self.timeout)
+        # The first frames of a clip are often black or a fade-in
+        seek = duration * self.seek_fraction if duration else 1.0
+        image = self.grab_frame(path, size, seek, max(0.1, deadline - time.monotonic()))
+        if image is None:
+            # Shorter than the seek point: take the first keyframe
+            image = self.grab_frame(path, size, 0, max(0.1, deadline - time.monotonic()))
+        if image is not None and width and height:
+            set_source_size(image, width, height)
+        return image
+
+
+DECODERS = {cls.name: cls for cls in (QtDecoder, PillowDecoder, FfmpegDecoder)}
+
+STILL_CHAIN = ["qt", "pillow"]
+DEFAULT_CHAINS = {
+    ".jpg": STILL_CHAIN,
+    ".jpeg": STILL_CHAIN,
+    ".png": STILL_CHAIN,
+    ".bmp": STILL_CHAIN,
+    ".webp": STILL_CHAIN,
+    ".tiff": STILL_CHAIN,
+    ".tif": STILL_CHAIN,
+    ".gif": STILL_CHAIN,
+    ".mp4": ["ffmpeg"],
+}
+
+
+class DecoderChain:
+    """Pick decoder backends per file extension and fall back along the chain.
+
+    overrides maps an extension (".jpg") to backend names, replacing its default chain.
+    """
+
+    def __init__(self, overrides=None):
+        self.backends = {}
+        for name, cls in DECODERS.items():
+            backend = cls()
+            if backend.available():
+                self.backends[name] = backend
+
+        self.chains = dict(DEFAULT_CHAINS)
+        for ext, names in (overrides or {}).items():
+            ext = ext.lower() if ext.startswith(".") else "." + ext.lower()
+            self.chains[ext] = list(names)
+
+    def decode(self, path, size):
+        """Decode path to thumbnail scale, trying each backend in turn"""
+        ext = Path(path).suffix.lower()
+        for name in self.chains.get(ext, STILL_CHAIN):
+            backend = self.backends.get(name)
+            if backend is None:
+                continue
+            try:
+                image = backend.decode(path, size)
+            except Exception as e:
+                print(f"{name} decoder failed on {path}: {e}")
+                continue
+            if image is not None:
+                return image
+        return None
@@ -1,16 +1,51 @@
 import sys
 import os
 import json
-from PySide6.QtWidgets import QApplication
+import time
 
-from app import WallpaperApp
+import tracing
+from client import send_command
 
 
 CONFIG_PATH = os.path.expanduser("~/wallpaper-select-beta/src/config.json")
+CLIENT_COMMANDS = {"--show": "show", "--toggle": "toggle", "--hide": "hide", "--quit": "quit"}
+
+
+def profile_path(argv):
+    """Trace file requested with --profile[=PATH], None without the flag"""
+    from thumbnail_cache import default_cache_root
+
+    for arg in argv:
+        if arg == "--profile":
+            name = time.strftime("trace-%Y%m%d-%H%M%S.json")
+            return os.path.join(default_cache_root(), "traces", name)
+        if arg.startswith("--profile="):
+            return os.path.expanduser(arg.split("=", 1)[1])
+    return None
 
 
 def main():
+    # Client mode: hand the command to a running daemon before anything
+    # heavy (PySide6, the config, the library) is loaded
+    command = next((CLIENT_COMMANDS[arg] for arg in sys.argv if arg in CLIENT_COMMANDS), None)
+    if command and send_command(command) is not None:
+        sys.exit(0)
+    if command in ("hide", "quit"):
+        print("huegen-gui daemon is not running")
+        sys.exit(1)
+    # --show/--toggle without a daemon: become the daemon and show the window
+    daemon_mode = "--daemon" in sys.argv or command is not None
+    if "--daemon" in sys.argv and send_command("ping") is not None:
+        print("huegen-gui daemon is already running")
+        sys.exit(1)
+
+    from PySide6.QtWidgets import QApplication
+    from app import WallpaperApp
+
     pywal_enabled = "--pywal" in sys.argv
+    trace_path = profile_path(sys.argv)
+    if trace_path:
+        tracing.enable()
 
     app = QApplication(sys.argv)
 
@@ -29,9 +64,28 @@ def main():
             print(f"Could not create config file: {e}")
 
     window = WallpaperApp(CONFIG_PATH, pywal_enabled=pywal_enabled)
-    window.show()
+    server = None
+    if daemon_mode:
+        from daemon import DaemonServer
+
+        server = DaemonServer(window)
+        if not server.listen():
+            server = None
+    if server is None or command is not None:
+        window.show()
 
-    sys.exit(app.exec())
+    code = app.exec()
+    if server is not None:
+        server.close()
+    if trace_path:
+        tracing.disable()
+        try:
+            tracing.write_trace(trace_path)
+            print(f"Trace written to {trace_path} (open it in https://ui.perfetto.dev or chrome://tracing)")
+        except OSError as e:
+            print(f"Could not write trace: {e}")
+        print(tracing.summary())
+    sys.exit(code)
 
 
 if __name__ == "__main__":
@@ -1,39 +1,235 @@
 import os
-from PySide6.QtCore import Qt, QThread, Signal
-from PySide6.QtGui import QPixmap
+from collections import deque
 
+from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, QThread, QTimer, Signal
+from PySide6.QtGui import QImage
 
-class ImageLoader(QThread):
-    """Background thread for loading images"""
-    image_loaded = Signal(str, QPixmap)
+import tracing
+from decoders import DecoderChain
+from analysis import perceptual_hash, dominant_colors
 
-    def __init__(self, image_paths, thumbnail_size):
+
+def cover_crop(image, width, height, dpr=1.0):
+    """Scale image to fill width x height device pixels and crop the overflow centered"""
+    scaled = image.scaled(width, height, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+    x = max(0, (scaled.width() - width) // 2)
+    y = max(0, (scaled.height() - height) // 2)
+    rendered = scaled.copy(x, y, width, height)
+    rendered.setDevicePixelRatio(dpr)
+    return rendered
+
+
+class ThumbnailJob(QRunnable):
+    """Decode a single thumbnail on a pool thread"""
+
+    def __init__(self, loader, img_path):
+        super().__init__()
+        self.loader = loader
+        self.img_path = img_path
+
+    def run(self):
+        image = rendered = None
+        if not self.loader.should_stop:
+            try:
+                with tracing.span("thumbnail.job"):
+                    image = self.loader.load_thumbnail(self.img_path)
+                    if image is not None:
+                        rendered = self.loader.render_cell(image)
+            except Exception as e:
+                print(f"Error loading {self.img_path}: {e}")
+        try:
+            self.loader._job_done.emit(
+                self.img_path,
+                image if image is not None else QImage(),
+                rendered if rendered is not None else QImage(),
+            )
+        except RuntimeError:
+            pass  # loader was destroyed while this job ran (app shutting down)
+
+
+class RenderJob(QRunnable):
+    """Re-render a loaded thumbnail at a new cell size on a pool thread"""
+
+    def __init__(self, loader, img_path, image, render_size):
         super().__init__()
-        self.image_paths = image_paths
+        self.loader = loader
+        self.img_path = img_path
+        self.image = image
+        self.render_size = render_size
+
+    def run(self):
+        if self.loader.should_stop or self.render_size != self.loader.render_size:
+            return  # the cell size changed again before this job started
+        with tracing.span("thumbnail.rerender"):
+            rendered = self.loader.render_cell(self.image, self.render_size)
+        try:
+            self.loader.image_rendered.emit(self.img_path, rendered)
+        except RuntimeError:
+            pass
+
+
+class ThumbnailLoader(QObject):
+    """Loads thumbnails concurrently on a worker pool.
+
+    Atlas hits for paths with scanned size/mtime are served on the UI thread without a stat.
+    """
+    image_loaded = Signal(str, QImage, QImage)  # path, thumbnail, cell-sized copy (may be null)
+    image_failed = Signal(str)
+    image_rendered = Signal(str, QImage)  # path, thumbnail re-rendered by render()
+    finished = Signal()
+
+    _job_done = Signal(str, QImage, QImage)
+
+    ATLAS_BATCH = 64  # atlas hits delivered per event loop iteration
+
+    def __init__(
+        self, thumbnail_size, thumbnail_cache=None, workers=None, decoders=None, thumbnail_atlas=None, parent=None
+    ):
+        super().__init__(parent)
         self.thumbnail_size = thumbnail_size
+        self.thumbnail_cache = thumbnail_cache
+        self.thumbnail_atlas = thumbnail_atlas
+        self.decoders = decoders or DecoderChain()
         self.should_stop = False
+        self.pending = 0
+        self.completed = 0  # jobs finished since startup, for throughput
+        self.render_size = None  # (width, height, device pixel ratio) of a cell's content
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(workers or QThread.idealThreadCount())
+        self._job_done.connect(self._on_job_done)
+        self._atlas_hits = deque()
+        self.atlas_timer = QTimer(self)
+        self.atlas_timer.setSingleShot(True)
+        self.atlas_timer.setInterval(0)
+        self.atlas_timer.timeout.connect(self._deliver_atlas_hits)
+
+    @property
+    def workers(self):
+        return self.pool.maxThreadCount()
+
+    def submit(self, image_paths, file_info=None):
+        """Load image_paths; file_info is an optional (size, mtime) per path, as scanned"""
+        self.should_stop = False
+        for i, img_path in enumerate(image_paths):
+            self.pending += 1
+            image = None
+            if self.thumbnail_atlas is not None and file_info is not None and file_info[i][0] > 0:
+                image = self.thumbnail_atlas.lookup(img_path, *file_info[i])
+            if image is not None:
+                self._atlas_hits.append((img_path, image))
+                self.atlas_timer.start()
+            else:
+                self.pool.start(ThumbnailJob(self, img_path))
+        tracing.counter("loader.pending", self.pending)
+
+    def _deliver_atlas_hits(self):
+        # Delivering a thumbnail lets the scheduler submit the next one, so
+        # hits keep arriving while this runs; yield to the event loop between batches
+        with tracing.span("thumbnail.atlas_batch"):
+            for _ in range(self.ATLAS_BATCH):
+                if not self._atlas_hits:
+                    return
+                img_path, image = self._atlas_hits.popleft()
+                self._on_job_done(img_path, image, QImage())
+        if self._atlas_hits:
+            self.atlas_timer.start()
+
+    def set_render_size(self, width, height, dpr):
+        """Cell content size in device pixels that thumbnails are rendered at"""
+        self.render_size = (width, height, dpr) if width > 0 and height > 0 else None
+
+    def render_cell(self, image, render_size=None):
+        """Cover-cropped copy of image at the cell size, None before the size is known"""
+        render_size = render_size or self.render_size
+        if render_size is None:
+            return None
+        with tracing.span("thumbnail.render"):
+            return cover_crop(image, *render_size)
+
+    def render(self, thumbnails):
+        """Re-render loaded (path, QImage) thumbnails at the current cell size.
+
+        Results arrive through image_rendered; jobs still queued when the
+        size changes again are skipped.
+        """
+        if self.render_size is None:
+            return
+        for img_path, image in thumbnails:
+            self.pool.start(RenderJob(self, img_path, image, self.render_size), 1)
+
+    def is_busy(self):
+        return self.pending > 0
 
     def stop(self):
         self.should_stop = True
+        self.pool.clear()
+        self._atlas_hits.clear()
+        self.pending = 0
 
-    def run(self):
-        for img_path in self.image_paths:
-            if self.should_stop:
-                break
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
 
-            try:
-                pixmap = QPixmap(img_path)
-                if not pixmap.isNull():
-                    scaled_pixmap = pixmap.scaled(
-                        self.thumbnail_size,
-                        self.thumbnail_size,
-                        Qt.KeepAspectRatio,
-                        Qt.SmoothTransformation,
-                    )
-                    self.image_loaded.emit(img_path, scaled_pixmap)
-
-                self.msleep(10)
-            except Exception as e:
-                print(f"Error loading {img_path}: {e}")
+    def load_thumbnail(self, img_path):
+        """Return the thumbnail QImage for img_path (runs on a pool thread)"""
+        st = os.stat(img_path)
+        if self.thumbnail_atlas is not None:
+            image = self.thumbnail_atlas.load(img_path, st)
+            if image is not None:
+                return image
+        if self.thumbnail_cache:
+            with tracing.span("thumbnail.cache_load"):
+                cached = self.thumbnail_cache.load(img_path, st)
+            if cached is not None:
+                if ":" not in cached.text("X-Huegen-Colors"):
+                    self.analyze(cached)  # thumbnail predates the current palette format
+                self.store_in_atlas(img_path, cached, st)
+                return cached
+
+        # Backends decode close to thumbnail scale, only trim the remainder
+        with tracing.span("thumbnail.decode", path=img_path):
+            scaled_image = self.decoders.decode(img_path, self.thumbnail_size)
+        if scaled_image is None:
+            return None
+        if scaled_image.width() > self.thumbnail_size or scaled_image.height() > self.thumbnail_size:
+            scaled_image = scaled_image.scaled(
+                self.thumbnail_size,
+                self.thumbnail_size,
+                Qt.KeepAspectRatio,
+                Qt.SmoothTransformation,
+            )
+        self.analyze(scaled_image)
+        if self.thumbnail_cache:
+            with tracing.span("thumbnail.cache_store"):
+                self.thumbnail_cache.store(img_path, scaled_image, st)
+        self.store_in_atlas(img_path, scaled_image, st)
+        scaled_image.setText("Thumb::MTime", str(int(st.st_mtime)))
+        scaled_image.setText("Thumb::Size", str(st.st_size))
+        return scaled_image
+
+    def store_in_atlas(self, img_path, image, st):
+        if self.thumbnail_atlas is not None:
+            with tracing.span("thumbnail.atlas_store"):
+                self.thumbnail_atlas.store(img_path, image, st)
+
+    @staticmethod
+    @tracing.traced("thumbnail.analyze")
+    def analyze(image):
+        """Attach the color palette and perceptual hash as thumbnail text keys.
 
+        Runs in the pool worker right after decoding, on the small thumbnail.
+        """
+        image.setText("X-Huegen-Colors", dominant_colors(image))
+        image.setText("X-Huegen-PHash", perceptual_hash(image))
 
+    def _on_job_done(self, img_path, image, rendered):
+        if self.should_stop:
+            return
+        self.pending = max(0, self.pending - 1)
+        self.completed += 1
+        if image.isNull():
+            self.image_failed.emit(img_path)
+        else:
+            self.image_loaded.emit(img_path, image, rendered)
+        if self.pending == 0:
+            self.finished.emit()
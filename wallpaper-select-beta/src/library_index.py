@@ -0,0 +1,77 @@
+import os
+import sqlite3
+
+from thumbnail_cache import default_cache_root
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    width INTEGER NOT NULL DEFAULT 0,
+    height INTEGER NOT NULL DEFAULT 0,
+    format TEXT NOT NULL DEFAULT '',
+    colors TEXT NOT NULL DEFAULT '',
+    phash TEXT NOT NULL DEFAULT ''
+)
+"""
+
+
+class LibraryIndex:
+    """Persistent SQLite index of the wallpaper library.
+
+    Writes are buffered and committed in one transaction by flush().
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(default_cache_root(), "library.sqlite3")
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+        self._pending = {}
+        self._removed = set()
+
+    def load_all(self):
+        """Return every indexed row as (path, mtime, size, width, height, format, colors, phash)"""
+        return self.conn.execute(
+            "SELECT path, mtime, size, width, height, format, colors, phash FROM files ORDER BY path"
+        ).fetchall()
+
+    def record(self, path, mtime, size, width=0, height=0, fmt="", colors="", phash=""):
+        self._removed.discard(path)
+        self._pending[path] = (path, mtime, size, width, height, fmt, colors, phash)
+
+    def remove(self, paths):
+        for path in paths:
+            self._pending.pop(path, None)
+            self._removed.add(path)
+
+    def has_pending(self):
+        return bool(self._pending or self._removed)
+
+    def flush(self):
+        if not self.has_pending():
+            return
+        try:
+            with self.conn:
+                if self._removed:
+                    self.conn.executemany(
+                        "DELETE FROM files WHERE path = ?", [(p,) for p in self._removed]
+                    )
+                if self._pending:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        list(self._pending.values()),
+                    )
+        except sqlite3.Error as e:
+            print(f"Could not update library index: {e}")
+        self._pending.clear()
+        self._removed.clear()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
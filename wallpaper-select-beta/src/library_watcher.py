@@ -0,0 +1,138 @@
+import os
+import time
+
+from PySide6.QtCore import QObject, QFileSystemWatcher, QTimer, Signal
+
+from scanner import iter_wallpaper_dirs, is_excluded
+
+
+class LibraryWatcher(QObject):
+    """Watch wallpaper directories and report changes in batches.
+
+    Event bursts are coalesced with a settle timer, then each dirty directory is diffed once.
+    """
+    changes_ready = Signal(list, list, list)  # added, removed, modified paths
+
+    def __init__(self, catalog, supported_formats, exclude=(), max_depth=None,
+                 settle_ms=300, max_delay_ms=2000, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.supported_formats = supported_formats
+        self.exclude = exclude
+        self.max_depth = max_depth
+        self.max_delay = max_delay_ms / 1000
+        self.known = {}
+        self.depths = {}
+        self._dirty = set()
+        self._first_dirty = 0.0
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._on_directory_changed)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(settle_ms)
+        self._timer.timeout.connect(self.flush)
+
+    def watch(self, directory, paths, depth=0):
+        """Start watching directory, whose current wallpapers are paths"""
+        self.known[directory] = set(paths)
+        self.depths[directory] = depth
+        if directory not in self.watcher.directories():
+            self.watcher.addPath(directory)
+
+    def unwatch(self, directory):
+        """Stop watching directory and everything below it; return its files"""
+        removed = []
+        prefix = directory + os.sep
+        for known_dir in [d for d in self.known if d == directory or d.startswith(prefix)]:
+            removed.extend(self.known.pop(known_dir))
+            self.depths.pop(known_dir, None)
+            self.watcher.removePath(known_dir)
+        return removed
+
+    def clear(self):
+        if self.watcher.directories():
+            self.watcher.removePaths(self.watcher.directories())
+        self.known.clear()
+        self.depths.clear()
+        self._dirty.clear()
+        self._timer.stop()
+
+    def _on_directory_changed(self, directory):
+        now = time.monotonic()
+        if not self._dirty:
+            self._first_dirty = now
+        self._dirty.add(directory)
+        # Flush at least every max_delay even if events keep coming
+        if now - self._first_dirty >= self.max_delay:
+            self.flush()
+        else:
+            self._timer.start()
+
+    def flush(self):
+        self._timer.stop()
+        added, removed, modified = [], [], []
+        catalog = self.catalog
+        for directory in sorted(self._dirty):
+            if directory not in self.known:
+                continue  # already dropped with a vanished parent
+            if not os.path.isdir(directory):
+                removed.extend(self.unwatch(directory))
+                continue
+
+            depth = self.depths[directory]
+            listing = iter_wallpaper_dirs(
+                [directory], self.supported_formats, self.exclude, max_depth=depth, start_depth=depth
+            )
+            after = set()
+            for _, _, files in listing:
+                after.update(files)
+            before = self.known[directory]
+            added.extend(after - before)
+            removed.extend(before - after)
+            for path in after & before:
+                entry_id = catalog.id_of(path)
+                if entry_id is None or not catalog.is_loaded(entry_id):
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if st.st_size != catalog.sizes[entry_id] or int(st.st_mtime) != int(catalog.mtimes[entry_id]):
+                    modified.append(path)
+            self.known[directory] = after
+
+            # A renamed/moved subdirectory only shows up as a parent change
+            for known_dir in [d for d in self.known if os.path.dirname(d) == directory]:
+                if not os.path.isdir(known_dir):
+                    removed.extend(self.unwatch(known_dir))
+
+            if self.max_depth is None or depth < self.max_depth:
+                added.extend(self._watch_new_subdirs(directory, depth))
+        self._dirty.clear()
+
+        if added or removed or modified:
+            self.changes_ready.emit(sorted(added), removed, modified)
+
+    def _watch_new_subdirs(self, directory, depth):
+        added = []
+        try:
+            with os.scandir(directory) as it:
+                subdirs = [
+                    e.path for e in it
+                    if e.is_dir() and e.path not in self.known
+                    and not e.name.startswith(".") and not is_excluded(e.path, self.exclude)
+                ]
+        except OSError:
+            return added
+        if not subdirs:
+            return added
+        for subdir, sub_depth, files in iter_wallpaper_dirs(
+            subdirs, self.supported_formats, self.exclude, self.max_depth, start_depth=depth + 1
+        ):
+            if subdir in self.known:
+                continue
+            self.watch(subdir, files, sub_depth)
+            added.extend(files)
+        return added
@@ -0,0 +1,121 @@
+import time
+
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QFont
+from PySide6.QtWidgets import QLabel
+
+
+class PerfOverlay(QLabel):
+    """Debug panel over the grid with live loader, cache and UI metrics.
+
+    Event-loop lateness above stall_ms counts as a stall; timers stop while hidden.
+    """
+
+    def __init__(self, grid, loader, scheduler, thumbnail_cache=None, refresh_ms=500, stall_ms=100):
+        super().__init__(grid)
+        self.grid = grid
+        self.loader = loader
+        self.scheduler = scheduler
+        self.thumbnail_cache = thumbnail_cache
+        self.stall_ms = stall_ms
+
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setFont(QFont("monospace", 9))
+        self.setTextFormat(Qt.PlainText)
+        self.setStyleSheet(
+            "background-color: rgba(17, 17, 27, 220); color: #cdd6f4;"
+            " border: 1px solid #45475a; border-radius: 6px; padding: 6px;"
+        )
+
+        self.stalls = 0
+        self.longest_stall_ms = 0.0
+        self.last_stall = 0.0
+        self._last_completed = 0
+        self._last_refresh = 0.0
+        self._throughput = 0.0
+        self._last_beat = 0.0
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(refresh_ms)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.heartbeat = QTimer(self)
+        self.heartbeat.setTimerType(Qt.PreciseTimer)
+        self.heartbeat.setInterval(20)
+        self.heartbeat.timeout.connect(self._beat)
+        self.hide()
+
+    def toggle(self):
+        self.setVisible(not self.isVisible())
+
+    def showEvent(self, event):
+        now = time.perf_counter()
+        self._last_refresh = self._last_beat = now
+        self._last_completed = self.loader.completed
+        self.refresh_timer.start()
+        self.heartbeat.start()
+        self.refresh()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        self.heartbeat.stop()
+        super().hideEvent(event)
+
+    def _beat(self):
+        now = time.perf_counter()
+        late_ms = (now - self._last_beat) * 1000 - self.heartbeat.interval()
+        self._last_beat = now
+        if late_ms > self.stall_ms:
+            self.stalls += 1
+            self.longest_stall_ms = max(self.longest_stall_ms, late_ms)
+            self.last_stall = now
+
+    def refresh(self):
+        now = time.perf_counter()
+        elapsed = now - self._last_refresh
+        completed = self.loader.completed
+        if elapsed > 0:
+            rate = (completed - self._last_completed) / elapsed
+            self._throughput = rate if not self._throughput else 0.5 * self._throughput + 0.5 * rate
+        self._last_refresh = now
+        self._last_completed = completed
+
+        lines = [
+            f"jobs      {self.scheduler.pending_count():>6} queued {self.loader.pending:>4} in flight"
+            f" ({self.loader.workers} workers)",
+            f"decode    {self._throughput:>6.1f} img/s {completed:>6} done",
+        ]
+        cache = self.thumbnail_cache
+        if cache is not None:
+            lookups = cache.hits + cache.misses
+            rate = f"{cache.hits / lookups:.0%}" if lookups else "-"
+            lines.append(f"cache     {rate:>6} hits  {cache.hits} hit / {cache.misses} miss")
+        atlas = self.loader.thumbnail_atlas
+        if atlas is not None:
+            lookups = atlas.hits + atlas.misses
+            rate = f"{atlas.hits / lookups:.0%}" if lookups else "-"
+            lines.append(
+                f"atlas     {rate:>6} hits  {len(atlas)} tiles, {atlas.used_bytes / 1048576:.0f} MB,"
+                f" {atlas.dead_count()} dead"
+            )
+        pixmaps = self.grid.pixmaps
+        lines.append(
+            f"pixmaps   {pixmaps.resident_bytes / 1048576:>6.1f} of {pixmaps.budget_bytes / 1048576:.0f} MB"
+            f" {len(pixmaps)} thumbs, {pixmaps.evictions} evicted"
+        )
+        preview = self.grid.preview
+        if preview is not None:
+            lines.append(
+                f"previews  {preview.resident_bytes / 1048576:>6.1f} of {preview.budget_bytes / 1048576:.0f} MB"
+            )
+        stall = f", last {now - self.last_stall:.0f} s ago" if self.stalls else ""
+        lines.append(
+            f"stalls    {self.stalls:>6} >{self.stall_ms} ms, longest {self.longest_stall_ms:.0f} ms{stall}"
+        )
+        lines.append(
+            f"relayout  {self.grid.last_layout_ms:>6.2f} ms, paint {self.grid.last_paint_ms:.2f} ms"
+        )
+        self.setText("\n".join(lines))
+        self.adjustSize()
+        self.move(self.grid.viewport().width() - self.width() - 8, 8)
+        self.raise_()
@@ -0,0 +1,88 @@
+from collections import OrderedDict
+
+from PySide6.QtGui import QImage
+
+
+MAX_VARIANTS = 2  # rendered sizes kept per thumbnail (e.g. windowed and maximized)
+
+
+def pixmap_bytes(pixmap):
+    if pixmap is None:
+        return 0
+    if isinstance(pixmap, QImage):
+        return pixmap.sizeInBytes()
+    return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
+class PixmapCache:
+    """In-memory thumbnails of the grid, bounded by a byte budget.
+
+    evict() drops least recently used entries the caller does not protect.
+    """
+
+    def __init__(self, budget_bytes=128 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.resident_bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # entry id -> [source, {(width, height): rendered}]
+
+    def __contains__(self, entry_id):
+        return entry_id in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, entry_id):
+        entry = self._entries.get(entry_id)
+        return entry[0] if entry else None
+
+    def put(self, entry_id, image):
+        self.pop(entry_id)
+        self._entries[entry_id] = [image, {}]
+        self.resident_bytes += pixmap_bytes(image)
+
+    def rendered(self, entry_id, size):
+        """Copy of entry_id rendered at size, or None (marks it as recently used)"""
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return None
+        self._entries.move_to_end(entry_id)
+        return entry[1].get(size)
+
+    def any_rendered(self, entry_id):
+        """Most recently rendered copy of entry_id at any size"""
+        entry = self._entries.get(entry_id)
+        if entry is None or not entry[1]:
+            return None
+        return next(reversed(entry[1].values()))
+
+    def set_rendered(self, entry_id, size, pixmap):
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return
+        variants = entry[1]
+        self.resident_bytes += pixmap_bytes(pixmap) - pixmap_bytes(variants.pop(size, None))
+        variants[size] = pixmap
+        while len(variants) > MAX_VARIANTS:
+            oldest = next(iter(variants))
+            self.resident_bytes -= pixmap_bytes(variants.pop(oldest))
+
+    def pop(self, entry_id):
+        entry = self._entries.pop(entry_id, None)
+        if entry is not None:
+            self.resident_bytes -= pixmap_bytes(entry[0]) + sum(map(pixmap_bytes, entry[1].values()))
+
+    def clear(self):
+        self._entries.clear()
+        self.resident_bytes = 0
+
+    def evict(self, keep):
+        """Drop least recently used entries for which keep(entry_id) is false until within budget"""
+        if self.resident_bytes <= self.budget_bytes:
+            return
+        for entry_id in list(self._entries):
+            if self.resident_bytes <= self.budget_bytes:
+                break
+            if not keep(entry_id):
+                self.pop(entry_id)
+                self.evictions += 1
@@ -0,0 +1,220 @@
+import time
+import shutil
+import subprocess
+from collections import OrderedDict
+from pathlib import Path
+
+from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, QThread, QTimer, QSize, Signal
+from PySide6.QtGui import QImage, QImageReader
+
+
+ANIMATED_FORMATS = {".gif", ".webp", ".mp4"}
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def decode_animation(path, size, max_frames, max_fps, timeout=10):
+    """Decode a thumbnail-sized, decimated frame sequence.
+
+    Returns (frames, interval_ms); frames is empty for stills and on
+    errors. Source frames closer together than 1/max_fps are skipped, and
+    decoding stops after max_frames frames.
+    """
+    if Path(path).suffix.lower() == ".mp4":
+        return _decode_video(path, size, max_frames, max_fps, timeout)
+
+    reader = QImageReader(path)
+    if not reader.supportsAnimation() or reader.imageCount() == 1:
+        return [], 0
+    source = reader.size()
+    if source.isValid():
+        reader.setScaledSize(source.scaled(QSize(size, size), Qt.KeepAspectRatio))
+
+    deadline = time.monotonic() + timeout
+    min_interval = 1000 / max_fps
+    frames = []
+    elapsed = kept_at = 0.0
+    while reader.canRead() and len(frames) < max_frames and time.monotonic() < deadline:
+        image = reader.read()
+        if image.isNull():
+            break
+        if not frames or elapsed - kept_at >= min_interval:
+            frames.append(image)
+            kept_at = elapsed
+        elapsed += max(reader.nextImageDelay(), 20)  # 0 ms delays would mean 'as fast as possible'
+    if len(frames) < 2:
+        return [], 0
+    # Play the kept frames evenly over the time span they covered
+    return frames, max(min_interval, kept_at / (len(frames) - 1))
+
+
+def _decode_video(path, size, max_frames, max_fps, timeout):
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return [], 0
+    result = subprocess.run(
+        [
+            ffmpeg, "-v", "error", "-nostdin", "-threads", "1",
+            "-t", f"{max_frames / max_fps:.3f}",
+            "-i", path,
+            "-an", "-sn",
+            "-vf", f"fps={max_fps},scale={size}:{size}:force_original_aspect_ratio=decrease",
+            "-frames:v", str(max_frames),
+            "-f", "image2pipe", "-c:v", "png", "-",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        timeout=timeout,
+    )
+    frames = []
+    for chunk in result.stdout.split(PNG_SIGNATURE)[1:]:
+        image = QImage.fromData(PNG_SIGNATURE + chunk, "PNG")
+        if not image.isNull():
+            frames.append(image)
+    if len(frames) < 2:
+        return [], 0
+    return frames, 1000 / max_fps
+
+
+class PreviewJob(QRunnable):
+    def __init__(self, player, path, generation):
+        super().__init__()
+        self.player = player
+        self.path = path
+        self.generation = generation
+
+    def run(self):
+        QThread.currentThread().setPriority(QThread.LowPriority)
+        player = self.player
+        if self.generation != player.generation:
+            return  # the target changed before this job started
+        try:
+            frames, interval = decode_animation(
+                self.path, player.size, player.max_frames, player.max_fps, player.timeout
+            )
+        except Exception as e:
+            print(f"Error decoding preview of {self.path}: {e}")
+            frames, interval = [], 0
+        try:
+            player._decoded.emit(self.path, self.generation, frames, int(interval))
+        except RuntimeError:
+            pass  # player deleted while decoding
+
+
+class AnimatedPreview(QObject):
+    """Plays the animation of one grid cell (the hovered or selected one).
+
+    Frames are decoded once on a low-priority thread and kept in an LRU bounded by budget_bytes.
+    """
+    frame_changed = Signal(int)  # entry id whose preview frame changed
+    _decoded = Signal(str, int, list, int)
+
+    def __init__(self, catalog, size, budget_bytes=64 * 1024 * 1024, max_fps=12, max_frames=48,
+                 timeout=10, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.size = size
+        self.budget_bytes = budget_bytes
+        self.max_fps = max_fps
+        self.max_frames = max_frames
+        self.timeout = timeout
+
+        self.cache = OrderedDict()  # path -> (frames, interval_ms, bytes); no frames = still
+        self.resident_bytes = 0
+        self.entry_id = -1
+        self.path = None
+        self.frame_index = 0
+        self.generation = 0
+        self.paused = False
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self._advance)
+        self._decoded.connect(self._on_decoded)
+
+    @staticmethod
+    def is_animated_format(path):
+        return Path(path).suffix.lower() in ANIMATED_FORMATS
+
+    def set_target(self, entry_id):
+        """Play entry_id's animation (-1 stops playback)"""
+        if entry_id == self.entry_id:
+            return
+        previous = self.entry_id
+        self.timer.stop()
+        self.entry_id = entry_id
+        self.path = None
+        self.frame_index = 0
+        self.generation += 1
+        self.pool.clear()  # drop decodes of earlier targets that have not started
+        if previous != -1:
+            self.frame_changed.emit(previous)  # back to the still thumbnail
+
+        if entry_id == -1:
+            return
+        path = self.catalog.paths[entry_id]
+        if not self.is_animated_format(path):
+            return
+        self.path = path
+        if path in self.cache:
+            self.cache.move_to_end(path)
+            self._play()
+        else:
+            self.pool.start(PreviewJob(self, path, self.generation))
+
+    def set_paused(self, paused):
+        """Pause while the target cell is scrolled out of view"""
+        if paused == self.paused:
+            return
+        self.paused = paused
+        if paused:
+            self.timer.stop()
+        else:
+            self._play()
+
+    def current_frame(self, entry_id):
+        """Frame to draw for entry_id, or None to draw the still thumbnail"""
+        if entry_id != self.entry_id or self.path is None:
+            return None
+        cached = self.cache.get(self.path)
+        if not cached or not cached[0]:
+            return None
+        frames = cached[0]
+        return frames[self.frame_index % len(frames)]
+
+    def clear(self):
+        self.set_target(-1)
+        self.cache.clear()
+        self.resident_bytes = 0
+
+    def stop(self):
+        self.set_target(-1)
+        self.pool.clear()
+
+    def _play(self):
+        cached = self.cache.get(self.path) if self.path else None
+        if not cached or not cached[0] or self.paused:
+            return
+        self.timer.start(max(cached[1], int(1000 / self.max_fps)))
+        self.frame_changed.emit(self.entry_id)
+
+    def _advance(self):
+        self.frame_index += 1
+        self.frame_changed.emit(self.entry_id)
+
+    def _on_decoded(self, path, generation, frames, interval):
+        size = sum(frame.sizeInBytes() for frame in frames)
+        if size > self.budget_bytes:
+            frames, size = [], 0  # would not fit anyway, show the still
+        if path in self.cache:
+            self.resident_bytes -= self.cache.pop(path)[2]
+        self.cache[path] = (frames, interval, size)
+        self.resident_bytes += size
+        # Evict least recently used sequences, never the one playing
+        for old_path in list(self.cache):
+            if self.resident_bytes <= self.budget_bytes:
+                break
+            if old_path != self.path:
+                self.resident_bytes -= self.cache.pop(old_path)[2]
+        if generation == self.generation and path == self.path:
+            self._play()
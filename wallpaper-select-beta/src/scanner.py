@@ -0,0 +1,127 @@
+import os
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+
+from PySide6.QtCore import QThread, Signal
+
+import tracing
+
+
+def is_excluded(path, exclude):
+    """True if path or its basename matches one of the exclude globs"""
+    name = os.path.basename(path)
+    return any(fnmatch(path, pattern) or fnmatch(name, pattern) for pattern in exclude)
+
+
+def in_library(path, roots, supported_formats, exclude=(), max_depth=None):
+    """True if a scan of roots with these settings would report path"""
+    if Path(path).suffix.lower() not in supported_formats:
+        return False
+    for root in roots:
+        if not path.startswith(root + os.sep):
+            continue
+        parts = path[len(root) + 1:].split(os.sep)
+        if max_depth is not None and len(parts) - 1 > max_depth:
+            continue
+        if any(part.startswith(".") for part in parts[:-1]):
+            continue
+        if exclude:
+            ancestors = [os.path.join(root, *parts[:i]) for i in range(1, len(parts) + 1)]
+            if any(is_excluded(p, exclude) for p in ancestors):
+                continue
+        return True
+    return False
+
+
+def iter_wallpaper_dirs(roots, supported_formats, exclude=(), max_depth=None, start_depth=0):
+    """Walk roots with os.scandir, yielding (directory, depth, wallpaper paths).
+
+    Each directory is yielded as soon as it has been listed, so callers can
+    show its files before the rest of the tree is read. Roots are depth
+    start_depth; max_depth=None means unlimited. Symlinked directories are
+    followed once (by inode) to avoid loops.
+    """
+    visited = set()
+    stack = [(os.path.abspath(os.path.expanduser(root)), start_depth) for root in reversed(roots)]
+    while stack:
+        directory, depth = stack.pop()
+        try:
+            st = os.stat(directory)
+        except OSError as e:
+            print(f"Error reading directory {directory}: {e}")
+            continue
+        if (st.st_dev, st.st_ino) in visited:
+            continue
+        visited.add((st.st_dev, st.st_ino))
+
+        files = []
+        subdirs = []
+        try:
+            with tracing.span("scan.listdir", directory=directory), os.scandir(directory) as it:
+                for entry in it:
+                    if exclude and is_excluded(entry.path, exclude):
+                        continue
+                    try:
+                        if entry.is_dir():
+                            if not entry.name.startswith("."):
+                                subdirs.append(entry.path)
+                        elif Path(entry.name).suffix.lower() in supported_formats:
+                            files.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"Error reading directory {directory}: {e}")
+            continue
+
+        files.sort()
+        yield directory, depth, files
+
+        if max_depth is None or depth < max_depth:
+            for subdir in sorted(subdirs, reverse=True):
+                stack.append((subdir, depth + 1))
+
+
+class LibraryScanner(QThread):
+    """Background thread that streams wallpapers found under the roots.
+
+    files_found carries (path, size, mtime) batches while the walk is still running.
+    """
+    files_found = Signal(list)
+    directory_scanned = Signal(str, list, int)  # directory, paths, depth
+
+    def __init__(self, roots, supported_formats, exclude=(), max_depth=None, batch_interval=0.1):
+        super().__init__()
+        self.roots = roots
+        self.supported_formats = supported_formats
+        self.exclude = exclude
+        self.max_depth = max_depth
+        self.batch_interval = batch_interval
+        self.should_stop = False
+
+    def stop(self):
+        self.should_stop = True
+
+    def run(self):
+        pending = []
+        last_emit = 0.0  # the first directory goes out immediately
+        for directory, depth, files in iter_wallpaper_dirs(
+            self.roots, self.supported_formats, self.exclude, self.max_depth
+        ):
+            if self.should_stop:
+                return
+            self.directory_scanned.emit(directory, files, depth)
+            with tracing.span("scan.stat", files=len(files)):
+                for path in files:
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    pending.append((path, st.st_size, st.st_mtime))
+            now = time.monotonic()
+            if pending and now - last_emit >= self.batch_interval:
+                self.files_found.emit(pending)
+                pending = []
+                last_emit = now
+        if pending:
+            self.files_found.emit(pending)
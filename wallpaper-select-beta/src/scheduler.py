@@ -0,0 +1,95 @@
+from collections import deque
+from itertools import chain
+
+from PySide6.QtCore import QObject
+
+import tracing
+from catalog import UNLOADED, FAILED
+
+
+class ThumbnailScheduler(QObject):
+    """Feeds the loader in priority order: visible cells, prefetch, background."""
+
+    def __init__(self, catalog, grid, loader, background_fill=True, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.grid = grid
+        self.loader = loader
+        self.background_fill = background_fill
+        self.max_in_flight = loader.workers
+
+        self.queue = deque()
+        self.in_flight = set()  # paths, so removed/reused catalog slots can't leak
+        self._background_items = None
+        self._background_pos = 0
+
+        grid.visible_range_changed.connect(self.reprioritize)
+        loader.image_loaded.connect(self._on_job_done)
+        loader.image_failed.connect(self._on_job_done)
+
+    def reset(self):
+        """Forget all queued work (in-flight jobs still complete)"""
+        self.queue.clear()
+        self.in_flight.clear()
+        self._background_items = None
+        self._background_pos = 0
+
+    @tracing.traced("scheduler.reprioritize")
+    def reprioritize(self):
+        """Rebuild the queue around the current viewport and scroll direction"""
+        grid = self.grid
+        items = grid.items
+        if items is not self._background_items:
+            # Filter changed: restart background fill over the new result set
+            self._background_items = items
+            self._background_pos = 0
+
+        first, last = grid.visible_range()
+        lo, hi = grid.prefetch_range()
+        # Prefetch nearest-first in the scroll direction
+        prefetch = range(lo, hi) if lo >= last else range(hi - 1, lo - 1, -1)
+        self.queue = deque(
+            items[i] for i in chain(range(first, last), prefetch) if self._needs_pixmap(items[i])
+        )
+        self._pump()
+
+    def pending_count(self):
+        return len(self.queue)
+
+    def _needs_pixmap(self, entry_id):
+        return (
+            entry_id not in self.grid.pixmaps
+            and self.catalog.paths[entry_id] not in self.in_flight
+            and self.catalog.states[entry_id] != FAILED
+        )
+
+    def _next_job(self):
+        while self.queue:
+            entry_id = self.queue.popleft()
+            if self._needs_pixmap(entry_id):
+                return entry_id
+
+        if not self.background_fill or self._background_items is None:
+            return None
+        items = self._background_items
+        states = self.catalog.states
+        while self._background_pos < len(items):
+            entry_id = items[self._background_pos]
+            self._background_pos += 1
+            if states[entry_id] == UNLOADED and self.catalog.paths[entry_id] not in self.in_flight:
+                return entry_id
+        return None
+
+    def _pump(self):
+        while len(self.in_flight) < self.max_in_flight:
+            entry_id = self._next_job()
+            if entry_id is None:
+                break
+            path = self.catalog.paths[entry_id]
+            self.in_flight.add(path)
+            self.loader.submit([path], [(self.catalog.sizes[entry_id], self.catalog.mtimes[entry_id])])
+        tracing.counter("scheduler.queue", len(self.queue))
+
+    def _on_job_done(self, image_path, *_args):
+        self.in_flight.discard(image_path)
+        self._pump()
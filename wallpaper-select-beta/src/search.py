@@ -0,0 +1,444 @@
+import os
+import re
+import unicodedata
+from array import array
+
+from PySide6.QtGui import QColor
+
+from analysis import parse_palette, brightness, dominant_hue, color_distance
+
+
+# fzf-style scoring
+SCORE_MATCH = 16
+BONUS_BOUNDARY = 8
+BONUS_CONSECUTIVE = 4
+BONUS_FIRST_CHAR = 2  # multiplier for the boundary bonus of the first character
+PENALTY_GAP_START = -3
+PENALTY_GAP_EXTENSION = -1
+BOUNDARY_CHARS = " _-./()[]"
+
+RATIO_TOLERANCE = 0.02
+COMPARISON = re.compile(r"^(w|h|width|height|size|brightness)(>=|<=|>|<|=)(\d+(?:\.\d+)?)([kmg]?)$")
+
+# Color search
+COLOR_THRESHOLD = 150  # max color_distance() for color:
+COLOR_MIN_SHARE = 0.05  # palette entries smaller than this are ignored by color:
+HUE_TOLERANCE = 20
+HUE_NAMES = {
+    "red": 0, "orange": 30, "yellow": 60, "lime": 90, "green": 120, "teal": 165,
+    "cyan": 180, "blue": 220, "purple": 275, "magenta": 300, "pink": 330,
+}
+SORT_KEYS = {"hue", "-hue", "brightness", "-brightness"}
+SIZE_SUFFIX = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def normalize(text):
+    """Lowercase text and strip accents, so 'Café' matches 'cafe'"""
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def char_mask(text):
+    """64-bit set of the characters in text (folded by code point), a cheap prefilter"""
+    mask = 0
+    for c in set(text):
+        mask |= 1 << (ord(c) & 63)
+    return mask
+
+
+def fuzzy_score(term, text):
+    """Score term as a subsequence of text, or None if it does not match.
+
+    Like fzf's v1 algorithm: find the first match greedily, then walk
+    backwards from its end to get the shortest window, and score that
+    window with bonuses for word boundaries and consecutive characters.
+    """
+    if len(term) == 1:
+        pos = text.find(term)
+        if pos < 0:
+            return None
+        if pos == 0 or text[pos - 1] in BOUNDARY_CHARS:
+            return SCORE_MATCH + BONUS_BOUNDARY * BONUS_FIRST_CHAR
+        return SCORE_MATCH
+
+    pos = -1
+    for ch in term:
+        pos = text.find(ch, pos + 1)
+        if pos < 0:
+            return None
+    end = pos + 1
+    for ch in reversed(term):
+        pos = text.rfind(ch, 0, pos + 1) - 1
+    start = pos + 1
+
+    score = 0
+    ti = 0
+    n = len(term)
+    consecutive = in_gap = False
+    for i in range(start, end):
+        if ti < n and text[i] == term[ti]:
+            gained = SCORE_MATCH
+            if i == 0 or text[i - 1] in BOUNDARY_CHARS:
+                gained += BONUS_BOUNDARY * (BONUS_FIRST_CHAR if ti == 0 else 1)
+            if consecutive:
+                gained += BONUS_CONSECUTIVE
+            score += gained
+            ti += 1
+            consecutive, in_gap = True, False
+        else:
+            score += PENALTY_GAP_EXTENSION if in_gap else PENALTY_GAP_START
+            consecutive, in_gap = False, True
+    return score
+
+
+class Query:
+    """A parsed search string (syntax in the README)."""
+
+    def __init__(self, text):
+        self.text = text
+        self.fuzzy = []
+        self.exact = []
+        self.excluded = []
+        self.filters = []
+        self.colors = []
+        self.sort = None
+        for term in normalize(text).split():
+            self._parse_term(term)
+
+    @property
+    def ranked(self):
+        """Whether results are ordered by score instead of by path"""
+        return bool(self.fuzzy or self.colors or self.sort)
+
+    @property
+    def empty(self):
+        return not (self.fuzzy or self.exact or self.excluded or self.filters or self.colors or self.sort)
+
+    def narrows(self, previous):
+        """True if every result of this query is also a result of previous.
+
+        Holds when this query only extends previous: the old last term is a
+        positive name term that keeps growing (and does not turn into a
+        filter like w>=3840 or ext:png), or new terms were appended.
+        """
+        if previous is None or not self.text.startswith(previous.text):
+            return False
+        if self.text == previous.text:
+            return True
+        if previous.text == "" or previous.text[-1].isspace() or self.text[len(previous.text)].isspace():
+            return True
+        return self._is_name_term(previous.text.split()[-1]) and self._is_name_term(self.text.split()[-1])
+
+    @staticmethod
+    def _is_name_term(term):
+        """True for a plain fuzzy name term (no exclusion, exact match or filter)"""
+        return not term.startswith(("!", "'")) and ":" not in term and COMPARISON.match(normalize(term)) is None
+
+    def _parse_term(self, term):
+        if term.startswith("!") and len(term) > 1:
+            self.excluded.append(term[1:])
+            return
+        if term.startswith("'") and len(term) > 1:
+            self.exact.append(term[1:])
+            return
+
+        match = COMPARISON.match(term)
+        if match:
+            key, op, value, suffix = match.groups()
+            value = float(value) * (SIZE_SUFFIX[suffix] if key == "size" else 1)
+            self.filters.append(("cmp", key[0], op, value))
+            return
+
+        key, _, value = term.partition(":")
+        if value and key == "ext":
+            exts = {"." + e.lstrip(".") for e in value.split(",") if e}
+            self.filters.append(("ext", exts))
+        elif value and key == "dir":
+            self.filters.append(("dir", value))
+        elif value and key == "ratio":
+            ratio = self._parse_ratio(value)
+            if ratio is not None:
+                self.filters.append(("ratio", ratio))
+        elif value and key == "color":
+            color = QColor("#" + value if re.fullmatch(r"[0-9a-f]{3}|[0-9a-f]{6}", value) else value)
+            if color.isValid():
+                self.colors.append((color.red(), color.green(), color.blue()))
+        elif value and key == "hue":
+            hue_range = self._parse_hue(value)
+            if hue_range is not None:
+                self.filters.append(("hue",) + hue_range)
+        elif value and key == "sort":
+            if value in SORT_KEYS:
+                self.sort = value
+        else:
+            self.fuzzy.append(term)
+
+    @staticmethod
+    def _parse_hue(value):
+        """(low, high) in degrees from 'blue', '200' or '180-240'"""
+        if value in HUE_NAMES:
+            center = HUE_NAMES[value]
+            return center - HUE_TOLERANCE, center + HUE_TOLERANCE
+        try:
+            if "-" in value:
+                low, high = value.split("-", 1)
+                return float(low), float(high)
+            center = float(value)
+        except ValueError:
+            return None
+        return center - HUE_TOLERANCE, center + HUE_TOLERANCE
+
+    @staticmethod
+    def _parse_ratio(value):
+        try:
+            if ":" in value or "x" in value:
+                num, den = re.split(r"[:x]", value, maxsplit=1)
+                return float(num) / float(den)
+            return float(value)
+        except (ValueError, ZeroDivisionError):
+            return None
+
+
+class SearchEngine:
+    """Name index over the catalog entries shown in the grid.
+
+    A query that extends the previous one only re-checks the previous results.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.clear()
+
+    def clear(self):
+        self.names = []
+        self.dirs = []
+        self.masks = array("Q")
+        self.postings = None
+        self.live = 0
+        self._stale = 0
+        self._palettes = {}
+        self._last_query = None
+        self._last_results = None
+        self.incomplete = set()  # ids filtered out because their dimensions/palette weren't known yet
+
+    def add(self, entry_id):
+        if entry_id >= len(self.names):
+            grow = entry_id + 1 - len(self.names)
+            self.names.extend([None] * grow)
+            self.dirs.extend([None] * grow)
+            self.masks.extend([0] * grow)
+        elif self.names[entry_id] is not None:
+            self._stale += 1
+            self.live -= 1
+        path = self.catalog.paths[entry_id]
+        name = normalize(os.path.basename(path))
+        self.names[entry_id] = name
+        self.dirs[entry_id] = normalize(os.path.dirname(path))
+        self.masks[entry_id] = char_mask(name)
+        self.live += 1
+        if self.postings is not None:
+            self._index(entry_id, name)
+        self._last_query = None
+
+    def remove(self, entry_id):
+        if entry_id < len(self.names) and self.names[entry_id] is not None:
+            self.names[entry_id] = None
+            self.dirs[entry_id] = None
+            self.masks[entry_id] = 0
+            self.live -= 1
+            self._stale += 1
+            self._last_query = None
+            self.incomplete.discard(entry_id)
+            if self.postings is not None and self._stale > max(self.live, 1024):
+                self.postings = None  # rebuilt by the next query that needs it
+
+    def _index(self, entry_id, name):
+        postings = self.postings
+        for gram in trigrams(name):
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array("i")
+            posting.append(entry_id)
+
+    def _build_postings(self):
+        self.postings = {}
+        self._stale = 0
+        for entry_id, name in enumerate(self.names):
+            if name is not None:
+                self._index(entry_id, name)
+
+    def _candidates(self, query, entry_ids):
+        """Entries that can possibly match query (a superset, verified by match())"""
+        long_terms = [t for t in query.exact if len(t) >= 3]
+        if long_terms:
+            if self.postings is None:
+                self._build_postings()
+            best = None
+            empty = array("i")
+            for term in long_terms:
+                for gram in trigrams(term):
+                    posting = self.postings.get(gram, empty)
+                    if best is None or len(posting) < len(best):
+                        best = posting
+            if len(best) * 8 < len(entry_ids):
+                return sorted(set(best), key=self.catalog.paths.__getitem__)
+            best = set(best)
+            return [i for i in entry_ids if i in best]
+
+        mask = 0
+        for term in query.fuzzy + query.exact:
+            mask |= char_mask(term)
+        if not mask:
+            return entry_ids
+        masks = self.masks
+        return [i for i in entry_ids if masks[i] & mask == mask]
+
+    def match(self, query, entry_id):
+        """Score of entry_id for query (0 when unranked), None if it is filtered out"""
+        name = self.names[entry_id] if entry_id < len(self.names) else None
+        if name is None:
+            return None
+        for term in query.exact:
+            if term not in name:
+                return None
+        for term in query.excluded:
+            if term in name:
+                return None
+        if query.filters and not self._passes_filters(query, entry_id, name):
+            return None
+        score = 0
+        for term in query.fuzzy:
+            term_score = fuzzy_score(term, name)
+            if term_score is None:
+                return None
+            score += term_score
+
+        if query.colors or query.sort:
+            info = self.color_info(entry_id)
+            if info is None:
+                self.incomplete.add(entry_id)  # palette not computed yet
+                return None
+            colors, bright, hue = info
+            for wanted in query.colors:
+                distance = min(
+                    (color_distance(wanted, rgb) for rgb, share in colors if share >= COLOR_MIN_SHARE),
+                    default=COLOR_THRESHOLD + 1,
+                )
+                if distance > COLOR_THRESHOLD:
+                    return None
+                score -= distance
+            if query.sort:
+                if query.sort.endswith("hue"):
+                    value = -1 if hue is None else 360 - hue  # grays last
+                else:
+                    value = bright
+                score = -value if query.sort.startswith("-") else value
+        return score
+
+    def metadata_changed(self, query, entry_id):
+        """True if entry_id, filtered out before its metadata was known, matches query now"""
+        if entry_id not in self.incomplete:
+            return False
+        self.incomplete.discard(entry_id)
+        if self.match(query, entry_id) is None:
+            return False
+        self._last_query = None  # the next search must not narrow past it
+        return True
+
+    def color_info(self, entry_id):
+        """(palette, brightness, dominant hue) of an entry, None before its thumbnail was analyzed"""
+        text = self.catalog.colors[entry_id]
+        if not text:
+            return None
+        cached = self._palettes.get(entry_id)
+        if cached is None or cached[0] != text:
+            colors = parse_palette(text)
+            cached = self._palettes[entry_id] = (text, colors, brightness(colors), dominant_hue(colors))
+        return cached[1:]
+
+    def _passes_filters(self, query, entry_id, name):
+        catalog = self.catalog
+        for kind, *args in query.filters:
+            if kind == "cmp":
+                key, op, value = args
+                if key == "s":
+                    actual = catalog.sizes[entry_id]
+                elif key == "b":
+                    info = self.color_info(entry_id)
+                    if info is None:
+                        self.incomplete.add(entry_id)
+                        return False
+                    actual = info[1]
+                else:
+                    actual = catalog.widths[entry_id] if key == "w" else catalog.heights[entry_id]
+                    if not actual:
+                        self.incomplete.add(entry_id)  # dimensions not known yet
+                        return False
+                if not (
+                    actual >= value if op == ">=" else
+                    actual <= value if op == "<=" else
+                    actual > value if op == ">" else
+                    actual < value if op == "<" else
+                    actual == value
+                ):
+                    return False
+            elif kind == "ext":
+                if os.path.splitext(name)[1] not in args[0]:
+                    return False
+            elif kind == "dir":
+                if args[0] not in self.dirs[entry_id]:
+                    return False
+            elif kind == "ratio":
+                width, height = catalog.widths[entry_id], catalog.heights[entry_id]
+                if not height:
+                    self.incomplete.add(entry_id)
+                    return False
+                if abs(width / height - args[0]) > RATIO_TOLERANCE * args[0]:
+                    return False
+            elif kind == "hue":
+                info = self.color_info(entry_id)
+                if info is None:
+                    self.incomplete.add(entry_id)
+                    return False
+                if info[2] is None:
+                    return False
+                low, high = args
+                span = high - low if 0 <= high - low <= 360 else (high - low) % 360  # 340-20 wraps past 0
+                if (info[2] - low) % 360 > span:
+                    return False
+        return True
+
+    def search(self, text, entry_ids):
+        """Return the ids of entry_ids matching text, best first (path order if unranked)"""
+        query = Query(text)
+        if query.empty:
+            self._last_query, self._last_results = query, None
+            return list(entry_ids)
+
+        # Entries dropped for missing metadata may match by now, only narrow without them
+        if not self.incomplete and query.narrows(self._last_query) and self._last_results is not None:
+            candidates = self._last_results
+        else:
+            candidates = self._candidates(query, entry_ids)
+        self.incomplete = set()
+
+        # Candidates are in path order, the stable sort keeps it for equal scores
+        scores = {}
+        for entry_id in candidates:
+            score = self.match(query, entry_id)
+            if score is not None:
+                scores[entry_id] = score
+        matches = list(scores)
+        if query.ranked:
+            results = sorted(matches, key=scores.__getitem__, reverse=True)
+        else:
+            results = matches
+
+        self._last_query, self._last_results = query, matches
+        return results
@@ -0,0 +1,299 @@
+import os
+import json
+import mmap
+import fcntl
+import threading
+from contextlib import contextmanager
+
+from PySide6.QtCore import QRunnable, QThreadPool
+from PySide6.QtGui import QImage
+
+import tracing
+from thumbnail_cache import default_cache_root
+
+
+TILES = "tiles.bin"
+INDEX = "index.jsonl"
+LOCK = "lock"
+# Set again from the index entry on every load
+VOLATILE_KEYS = ("Thumb::URI", "Thumb::MTime", "Thumb::Size", "Software")
+
+
+class CompactJob(QRunnable):
+    """Rewrite the atlas without dead tiles on a pool thread"""
+
+    def __init__(self, atlas, keep):
+        super().__init__()
+        self.atlas = atlas
+        self.keep = keep
+
+    def run(self):
+        try:
+            self.atlas.compact(self.keep)
+        except Exception as e:
+            print(f"Could not compact thumbnail atlas: {e}")
+        finally:
+            self.atlas.compacting = False
+
+
+class ThumbnailAtlas:
+    """Packed thumbnail store that is read straight from a memory map.
+
+    Tiles are raw RGB32 pixels in tiles.bin, indexed by the append-only index.jsonl.
+    """
+
+    def __init__(self, thumbnail_size, cache_dir=None, max_bytes=256 * 1024 * 1024):
+        root = cache_dir or os.path.join(default_cache_root(), "atlas")
+        self.thumbnail_size = thumbnail_size
+        self.directory = os.path.join(root, str(thumbnail_size))
+        self.tile_bytes = thumbnail_size * thumbnail_size * 4
+        self.capacity = max(1, max_bytes // self.tile_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.compacting = False
+        self.closed = False
+        self._lock = threading.Lock()
+        self._entries = {}  # path -> (slot, width, height, mtime, size, texts)
+        self._used = 0  # slots handed out, live or dead
+        self._fd = -1
+        self._map = None
+        self._view = None
+        self._retired = []  # maps of replaced files, QImages may still point into them
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock_fd = os.open(os.path.join(self.directory, LOCK), os.O_RDWR | os.O_CREAT, 0o644)
+        with self._file_lock():
+            self._open()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def used_bytes(self):
+        return self._used * self.tile_bytes
+
+    def dead_count(self):
+        return self._used - len(self._entries)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock against other processes using this atlas"""
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _read_index(self, f, entries, used):
+        for line in f:
+            try:
+                path, slot, width, height, mtime, size, texts = json.loads(line)
+            except ValueError:
+                continue  # torn last line of a crashed run
+            entries[path] = (slot, width, height, mtime, size, texts)
+            used = max(used, slot + 1)
+        self._index_pos = f.tell()
+        return used
+
+    def _open(self):
+        """Read the index and map tiles.bin (file lock held, thread lock held or not shared yet)"""
+        entries = {}
+        used = 0
+        self._index_pos = 0
+        try:
+            with open(os.path.join(self.directory, INDEX), "r", encoding="utf-8") as f:
+                used = self._read_index(f, entries, used)
+        except FileNotFoundError:
+            pass
+
+        tiles = os.path.join(self.directory, TILES)
+        self._fd = os.open(tiles, os.O_RDWR | os.O_CREAT, 0o644)
+        length = max(self.capacity, used) * self.tile_bytes
+        if os.fstat(self._fd).st_size < length:
+            os.ftruncate(self._fd, length)  # sparse, unused slots take no disk space
+        self._map = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self._index = open(os.path.join(self.directory, INDEX), "a", encoding="utf-8")
+        self._entries = entries
+        self._used = used
+
+    def _close_files(self):
+        self._index.close()
+        os.close(self._fd)
+
+    def _sync(self):
+        """Catch up with other processes (both locks held); False if the files were replaced"""
+        index = os.path.join(self.directory, INDEX)
+        try:
+            replaced = os.stat(index).st_ino != os.fstat(self._index.fileno()).st_ino
+        except FileNotFoundError:
+            replaced = True
+        if replaced:
+            # Compacted by another process
+            self._retired.append(self._map)
+            self._close_files()
+            self._open()
+            return False
+        with open(index, "r", encoding="utf-8") as f:
+            f.seek(self._index_pos)
+            self._used = self._read_index(f, self._entries, self._used)
+        return True
+
+    def load(self, path, st=None):
+        """Return a QImage over the mapped tile for path, or None on miss/stale entry"""
+        try:
+            st = st or os.stat(path)
+        except OSError:
+            return None
+        return self.lookup(path, st.st_size, st.st_mtime)
+
+    def lookup(self, path, size, mtime):
+        """Like load() with size and mtime already known (from the catalog), so it never touches the disk"""
+        with self._lock:
+            entry = self._entries.get(path)
+            # A slot past our mapping was allocated by a process with a larger atlas
+            if (
+                entry is None or entry[3] != int(mtime) or entry[4] != size
+                or (entry[0] + 1) * self.tile_bytes > len(self._view)
+            ):
+                self.misses += 1
+                return None
+            self.hits += 1
+            slot, width, height, mtime, size, texts = entry
+            offset = slot * self.tile_bytes
+            image = QImage(
+                self._view[offset:offset + width * height * 4], width, height, width * 4, QImage.Format_RGB32
+            )
+        for key, value in texts.items():
+            image.setText(key, value)
+        image.setText("Thumb::MTime", str(mtime))
+        image.setText("Thumb::Size", str(size))
+        return image
+
+    def contains(self, path, st):
+        entry = self._entries.get(path)
+        return entry is not None and entry[3] == int(st.st_mtime) and entry[4] == st.st_size
+
+    def store(self, path, image, st=None):
+        """Append image as the tile for path; False when it is not stored (atlas full)"""
+        if self.closed or image is None or image.isNull():
+            return False
+        if image.width() > self.thumbnail_size or image.height() > self.thumbnail_size:
+            return False
+        try:
+            st = st or os.stat(path)
+        except OSError:
+            return False
+        if self.contains(path, st):
+            return True
+
+        pixels = image.convertToFormat(QImage.Format_RGB32)
+        width, height = pixels.width(), pixels.height()
+        data = bytes(pixels.constBits())[:width * height * 4]
+        texts = {key: image.text(key) for key in image.textKeys() if key not in VOLATILE_KEYS}
+        entry = (int(st.st_mtime), st.st_size)
+        with self._lock, self._file_lock():
+            if self.closed:
+                return False
+            self._sync()
+            if self.contains(path, st):
+                return True  # stored by another process meanwhile
+            if self._used >= self.capacity:
+                return False
+            slot = self._used
+            self._used += 1
+            try:
+                os.pwrite(self._fd, data, slot * self.tile_bytes)
+                self._index.write(json.dumps([path, slot, width, height, *entry, texts]) + "\n")
+                self._index.flush()
+                self._index_pos = self._index.tell()
+            except OSError as e:
+                print(f"Could not write atlas tile for {path}: {e}")
+                return False
+            self._entries[path] = (slot, width, height, *entry, texts)
+        return True
+
+    def compact_async(self, keep, min_dead_ratio=0.25):
+        """Compact in the background if enough tiles are dead.
+
+        keep is the library's paths in display order; entries for other
+        paths are dropped, and the kept tiles are laid out in that order so
+        the first screen is one sequential read.
+        """
+        if self.compacting or self.closed:
+            return False
+        keep = list(keep)
+        live = sum(1 for path in keep if path in self._entries)
+        if self._used - live <= max(1, self._used * min_dead_ratio):
+            return False
+        self.compacting = True
+        QThreadPool.globalInstance().start(CompactJob(self, keep), -1)
+        return True
+
+    @tracing.traced("atlas.compact")
+    def compact(self, keep):
+        """Rewrite tiles.bin and index.jsonl with only the entries in keep"""
+        tiles = os.path.join(self.directory, TILES)
+        index = os.path.join(self.directory, INDEX)
+        tmp_tiles = f"{tiles}.{os.getpid()}.tmp"
+        tmp_index = f"{index}.{os.getpid()}.tmp"
+        with self._lock:
+            entries = dict(self._entries)
+            used = self._used
+            view = self._view
+
+        new_entries = {}
+        fd = os.open(tmp_tiles, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, self.capacity * self.tile_bytes)
+            with open(tmp_index, "w", encoding="utf-8") as out:
+
+                def copy(path, entry):
+                    slot, width, height, mtime, size, texts = entry
+                    offset = slot * self.tile_bytes
+                    if offset + width * height * 4 > len(view):
+                        return
+                    new_slot = len(new_entries)
+                    os.pwrite(fd, view[offset:offset + width * height * 4], new_slot * self.tile_bytes)
+                    out.write(json.dumps([path, new_slot, width, height, mtime, size, texts]) + "\n")
+                    new_entries[path] = (new_slot, width, height, mtime, size, texts)
+
+                for path in keep:
+                    if self.closed:
+                        return
+                    if len(new_entries) >= self.capacity:
+                        break
+                    entry = entries.get(path)
+                    if entry is not None and path not in new_entries:
+                        copy(path, entry)
+
+                with self._lock, self._file_lock():
+                    if self.closed or not self._sync():
+                        return  # another process compacted meanwhile
+                    # Tiles stored while we were copying (by us or other processes)
+                    keep = set(keep)
+                    for path, entry in self._entries.items():
+                        if entry is not entries.get(path) and path in keep and len(new_entries) < self.capacity:
+                            copy(path, entry)
+                    out.flush()
+                    os.replace(tmp_tiles, tiles)
+                    os.replace(tmp_index, index)
+                    self._retired.append(self._map)
+                    self._close_files()
+                    self._open()
+                    reclaimed = max(0, used - len(new_entries))
+                    print(f"Compacted thumbnail atlas: {len(new_entries)} tiles kept, {reclaimed} reclaimed")
+        finally:
+            os.close(fd)
+            for tmp in (tmp_tiles, tmp_index):
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+
+    def close(self):
+        """Stop writing; the mapping stays alive for QImages that still use it"""
+        with self._lock:
+            self.closed = True
+            self._close_files()
+            os.close(self._lock_fd)
@@ -0,0 +1,157 @@
+import os
+import hashlib
+import threading
+from pathlib import Path
+
+from PySide6.QtGui import QImage, QImageReader
+
+
+def default_cache_root():
+    """Return $XDG_CACHE_HOME/huegen (falls back to ~/.cache/huegen)"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "huegen")
+
+
+class ThumbnailCache:
+    """Persistent on-disk thumbnail cache (freedesktop thumbnail layout).
+
+    Kept under max_bytes by evicting the least recently used files.
+    """
+
+    def __init__(self, thumbnail_size, cache_dir=None, max_bytes=512 * 1024 * 1024):
+        root = cache_dir or os.path.join(default_cache_root(), "thumbnails")
+        self.thumbnail_size = thumbnail_size
+        self.directory = os.path.join(root, str(thumbnail_size))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as e:
+            print(f"Could not create thumbnail cache at {self.directory}: {e}")
+        self._total_bytes = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def file_uri(path):
+        return Path(os.path.abspath(path)).as_uri()
+
+    def thumb_path(self, path):
+        digest = hashlib.md5(self.file_uri(path).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + ".png")
+
+    def load(self, path, st=None):
+        """Return the cached QImage for path, or None on miss/stale entry"""
+        thumb = self.thumb_path(path)
+        try:
+            st = st or os.stat(path)
+        except OSError:
+            return None
+        if not os.path.exists(thumb):
+            self._count(hit=False)
+            return None
+
+        # QImageReader.text() mangles keys containing "::", so the spec keys
+        # are checked on the decoded image instead.
+        image = QImageReader(thumb, b"png").read()
+        if (
+            image.isNull()
+            or image.text("Thumb::MTime") != str(int(st.st_mtime))
+            or image.text("Thumb::Size") != str(st.st_size)
+        ):
+            self._remove(thumb)
+            self._count(hit=False)
+            return None
+
+        try:
+            os.utime(thumb)  # file mtime doubles as the LRU access time
+        except OSError:
+            pass
+        self._count(hit=True)
+        return image
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def store(self, path, image, st=None):
+        """Write image as the thumbnail for path"""
+        if image is None or image.isNull():
+            return
+        try:
+            st = st or os.stat(path)
+        except OSError:
+            return
+
+        image = QImage(image)
+        image.setText("Thumb::URI", self.file_uri(path))
+        image.setText("Thumb::MTime", str(int(st.st_mtime)))
+        image.setText("Thumb::Size", str(st.st_size))
+        image.setText("Software", "huegen-gui")
+
+        thumb = self.thumb_path(path)
+        tmp = f"{thumb}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if not image.save(tmp, "PNG"):
+                return
+            old_size = os.path.getsize(thumb) if os.path.exists(thumb) else 0
+            os.replace(tmp, thumb)
+            new_size = os.path.getsize(thumb)
+        except OSError as e:
+            print(f"Could not write thumbnail for {path}: {e}")
+            self._remove(tmp)
+            return
+
+        with self._lock:
+            self._total_bytes += new_size - old_size
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self.prune()
+
+    def total_bytes(self):
+        with self._lock:
+            return self._total_bytes
+
+    def prune(self):
+        """Evict least recently used thumbnails until the cache fits max_bytes"""
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, _, size in entries)
+            if total > self.max_bytes:
+                # Leave some headroom so we don't prune again on the next store
+                target = int(self.max_bytes * 0.9)
+                entries.sort(key=lambda e: e[1])
+                for thumb, _, size in entries:
+                    if total <= target:
+                        break
+                    if self._remove(thumb):
+                        total -= size
+            self._total_bytes = total
+
+    def _entries(self):
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(".png"):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((entry.path, st.st_mtime, st.st_size))
+        except OSError:
+            pass
+        return entries
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
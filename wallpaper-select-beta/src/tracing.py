@@ -0,0 +1,161 @@
+"""Span and counter instrumentation, exported as Chrome trace JSON.
+
+Everything is a no-op until enable() is called (huegen-gui.py --profile):
+span() then hands out a shared null context manager and traced() adds one
+global lookup per call. Spans can be recorded from any thread.
+"""
+import os
+import json
+import time
+import functools
+import threading
+
+
+enabled = False
+_events = []  # (name, start_ns, duration_ns, thread id, args); list.append is atomic
+_counters = []  # (name, ts_ns, value)
+_thread_names = {}
+_origin = 0
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _record(name, start_ns, end_ns, args):
+    thread = threading.current_thread()
+    tid = thread.ident
+    if tid not in _thread_names:
+        _thread_names[tid] = thread.name
+    _events.append((name, start_ns, end_ns - start_ns, tid, args))
+
+
+def span(name, **args):
+    """Time a block: `with tracing.span("grid.layout"):` (a shared no-op while disabled)"""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name, args or None)
+
+
+def traced(name):
+    """Decorator form of span()"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(name, start, time.perf_counter_ns(), None)
+        return wrapper
+    return decorate
+
+
+def add_span(name, start_ns, end_ns=None, **args):
+    """Record work that started earlier (e.g. a subprocess), from its perf_counter_ns() start"""
+    if enabled and start_ns:
+        _record(name, start_ns, end_ns or time.perf_counter_ns(), args or None)
+
+
+def counter(name, value):
+    if enabled:
+        _counters.append((name, time.perf_counter_ns(), value))
+
+
+def now():
+    """Start timestamp for add_span(), 0 while disabled"""
+    return time.perf_counter_ns() if enabled else 0
+
+
+def enable():
+    global enabled, _origin
+    _events.clear()
+    _counters.clear()
+    _origin = time.perf_counter_ns()
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def write_trace(path):
+    """Write the recorded spans and counters as Chrome trace JSON (chrome://tracing, Perfetto)"""
+    pid = os.getpid()
+    events = [
+        {"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": "huegen-gui"}}
+    ]
+    for tid, name in _thread_names.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+    for name, start, duration, tid, args in list(_events):
+        event = {
+            "name": name,
+            "cat": name.split(".", 1)[0],
+            "ph": "X",
+            "ts": (start - _origin) / 1000,
+            "dur": duration / 1000,
+            "pid": pid,
+            "tid": tid,
+        }
+        if args:
+            event["args"] = {k: v if isinstance(v, (int, float, bool)) else str(v) for k, v in args.items()}
+        events.append(event)
+    for name, ts, value in list(_counters):
+        events.append({"name": name, "ph": "C", "ts": (ts - _origin) / 1000, "pid": pid, "args": {"value": value}})
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summary():
+    """Per-span count, total and p50/p95/p99/max in milliseconds, slowest total first"""
+    durations = {}
+    for name, _start, duration, _tid, _args in list(_events):
+        durations.setdefault(name, []).append(duration / 1e6)
+    rows = []
+    for name, values in durations.items():
+        values.sort()
+        rows.append((name, len(values), sum(values), _percentile(values, 0.5), _percentile(values, 0.95),
+                     _percentile(values, 0.99), values[-1]))
+    rows.sort(key=lambda row: row[2], reverse=True)
+
+    width = max([len(row[0]) for row in rows] + [4])
+    lines = [f"{'span':<{width}} {'count':>7} {'total ms':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"]
+    for name, count, total, p50, p95, p99, peak in rows:
+        lines.append(
+            f"{name:<{width}} {count:>7} {total:>10.1f} {p50:>8.2f} {p95:>8.2f} {p99:>8.2f} {peak:>8.2f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,222 @@
+import os
+import re
+import shutil
+import hashlib
+from collections import deque
+from pathlib import Path
+
+from PySide6.QtCore import QObject, QProcess, Signal
+
+import tracing
+from thumbnail_cache import default_cache_root
+
+
+DURATION = re.compile(rb"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+class VideoConverter(QObject):
+    """Cached MP4 -> animated WebP conversion on a bounded background queue.
+
+    convert(urgent=True) jumps the queue and may interrupt a background encode.
+    """
+    progress = Signal(str, float)  # source, fraction done (0-1)
+    converted = Signal(str, str)  # source, webp path
+    failed = Signal(str, str)  # source, error
+
+    def __init__(self, fps=30, width=1920, quality=85, cache_dir=None, max_jobs=1, parent=None):
+        super().__init__(parent)
+        self.fps = fps
+        self.width = width
+        self.quality = quality
+        self.max_jobs = max(1, max_jobs)
+        self.directory = cache_dir or os.path.join(default_cache_root(), "webp")
+        self.ffmpeg = shutil.which("ffmpeg")
+        self.queue = deque()
+        self.running = {}  # QProcess -> (source, output)
+        self._started = {}  # QProcess -> tracing.now() at start
+        self._durations = {}
+        self.urgent = set()  # sources someone is waiting for
+        self.background = set()  # sources queued by precompute() or a non-urgent convert()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as e:
+            print(f"Could not create conversion cache at {self.directory}: {e}")
+
+    def output_path(self, source):
+        st = os.stat(source)
+        uri = Path(os.path.abspath(source)).as_uri()
+        digest = hashlib.md5(f"{uri}\0{st.st_size}\0{st.st_mtime_ns}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}-{self.fps}fps-{self.width}w.webp")
+
+    def cached(self, source):
+        """Path of the finished WebP for source, or None if it still has to be converted"""
+        try:
+            output = self.output_path(source)
+        except OSError:
+            return None
+        return output if os.path.exists(output) else None
+
+    def is_pending(self, source):
+        return source in self.queue or any(s == source for s, _ in self.running.values())
+
+    def convert(self, source, urgent=False):
+        """Queue source unless it is cached or already queued; returns the cached output if any"""
+        output = self.cached(source)
+        if output:
+            return output
+        if not urgent:
+            self.background.add(source)
+            if not self.is_pending(source):
+                self.queue.append(source)
+            self._pump()
+            return None
+
+        self.urgent.add(source)
+        if self.is_pending(source) and source not in self.queue:
+            return None  # already encoding
+        if source in self.queue:
+            self.queue.remove(source)
+        self.queue.appendleft(source)
+        if len(self.running) >= self.max_jobs:
+            self._preempt()
+        self._pump()
+        return None
+
+    def precompute(self, sources):
+        """Queue every source that has no cached output yet"""
+        for source in sources:
+            if not self.cached(source) and not self.is_pending(source):
+                self.background.add(source)
+                self.queue.append(source)
+        self._pump()
+
+    def pending_count(self):
+        return len(self.queue) + len(self.running)
+
+    def stop(self):
+        """Drop the queue and kill running encodes (their partial files are removed)"""
+        self.queue.clear()
+        self.urgent.clear()
+        self.background.clear()
+        for process in list(self.running):
+            self._kill(process)
+        self._started.clear()
+
+    def cancel(self, source):
+        """Nobody waits for source anymore: drop it, or leave it to precompute if that queued it too"""
+        self.urgent.discard(source)
+        if source in self.background:
+            if source in self.queue:
+                self.queue.remove(source)
+                self.queue.append(source)
+            return
+        if source in self.queue:
+            self.queue.remove(source)
+        for process, (running_source, _output) in list(self.running.items()):
+            if running_source == source:
+                self._kill(process)
+        self._pump()
+
+    def _preempt(self):
+        """Interrupt a background encode and queue it again behind the urgent sources"""
+        for process, (source, _output) in self.running.items():
+            if source not in self.urgent:
+                self._kill(process)
+                position = sum(1 for s in self.queue if s in self.urgent)
+                self.queue.insert(position, source)
+                return
+
+    def _kill(self, process):
+        source, output = self.running.pop(process)
+        process.finished.disconnect()
+        process.kill()
+        process.waitForFinished(1000)
+        process.deleteLater()
+        self._started.pop(process, None)
+        self._durations.pop(process, None)
+        self._remove_partial(output)
+        return source
+
+    def _pump(self):
+        while self.queue and len(self.running) < self.max_jobs:
+            source = self.queue.popleft()
+            if self.ffmpeg is None:
+                self._forget(source)
+                self.failed.emit(source, "ffmpeg not found")
+                continue
+            try:
+                output = self.output_path(source)
+            except OSError as e:
+                self._forget(source)
+                self.failed.emit(source, str(e))
+                continue
+            if os.path.exists(output):
+                self._forget(source)
+                self.converted.emit(source, output)
+                continue
+            self._start(source, output)
+
+    def _forget(self, source):
+        self.urgent.discard(source)
+        self.background.discard(source)
+
+    def _start(self, source, output):
+        process = QProcess(self)
+        process.setProgram(self.ffmpeg)
+        process.setArguments([
+            "-y", "-nostdin", "-loglevel", "info", "-nostats", "-progress", "pipe:1",
+            "-i", source,
+            "-vf", f"fps={self.fps},scale={self.width}:-1:flags=lanczos",
+            "-loop", "0", "-c:v", "libwebp", "-quality", str(self.quality),
+            "-f", "webp", output + ".part",
+        ])
+        process.readyReadStandardOutput.connect(lambda: self._on_progress(process))
+        process.readyReadStandardError.connect(lambda: self._on_stderr(process))
+        process.finished.connect(lambda code, status: self._on_finished(process, code, status))
+        self.running[process] = (source, output)
+        self._started[process] = tracing.now()
+        process.start()
+
+    def _on_stderr(self, process):
+        data = bytes(process.readAllStandardError())
+        if process not in self._durations:
+            match = DURATION.search(data)
+            if match:
+                hours, minutes, seconds = match.groups()
+                self._durations[process] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    def _on_progress(self, process):
+        source, _output = self.running.get(process, (None, None))
+        duration = self._durations.get(process)
+        for line in bytes(process.readAllStandardOutput()).splitlines():
+            if source and duration and line.startswith(b"out_time_us="):
+                try:
+                    done = int(line.split(b"=", 1)[1]) / 1_000_000
+                except ValueError:
+                    continue
+                self.progress.emit(source, max(0.0, min(1.0, done / duration)))
+
+    def _on_finished(self, process, code, status):
+        source, output = self.running.pop(process)
+        self._forget(source)
+        self._durations.pop(process, None)
+        tracing.add_span("convert.ffmpeg", self._started.pop(process, 0), source=source, exit_code=code)
+        process.deleteLater()
+        if status == QProcess.NormalExit and code == 0:
+            try:
+                os.replace(output + ".part", output)
+            except OSError as e:
+                self.failed.emit(source, str(e))
+            else:
+                self.converted.emit(source, output)
+        else:
+            self._remove_partial(output)
+            self.failed.emit(source, f"ffmpeg exited with code {code}")
+        self._pump()
+
+    @staticmethod
+    def _remove_partial(output):
+        try:
+            os.remove(output + ".part")
+        except OSError:
+            pass
@@ -0,0 +1,333 @@
+import os
+import glob
+import json
+import hashlib
+import colorsys
+import threading
+from pathlib import Path
+
+from PySide6.QtCore import QRunnable, QThreadPool, QThread
+
+from analysis import palette
+from decoders import DecoderChain
+from thumbnail_cache import default_cache_root
+
+try:
+    import pywal
+except ImportError:  # pywal is optional, colors.json and user templates are written directly
+    pywal = None
+
+
+SAMPLE_SIZE = 256  # images are decoded at this size for color extraction
+SCHEME_VERSION = 1
+
+
+def wal_cache_dir():
+    """pywal's output directory ($XDG_CACHE_HOME/wal)"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "wal")
+
+
+def wal_template_dir():
+    """pywal's user template directory ($XDG_CONFIG_HOME/wal/templates)"""
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return os.path.join(base, "wal", "templates")
+
+
+def hex_to_rgb(color):
+    value = int(color.lstrip("#"), 16)
+    return (value >> 16) & 255, (value >> 8) & 255, value & 255
+
+
+def rgb_to_hex(rgb):
+    return "#%02x%02x%02x" % tuple(max(0, min(255, int(c))) for c in rgb)
+
+
+def darken_color(color, amount):
+    return rgb_to_hex(c * (1 - amount) for c in hex_to_rgb(color))
+
+
+def lighten_color(color, amount):
+    return rgb_to_hex(c + (255 - c) * amount for c in hex_to_rgb(color))
+
+
+def blend_color(color, color2):
+    return rgb_to_hex(0.5 * a + 0.5 * b for a, b in zip(hex_to_rgb(color), hex_to_rgb(color2)))
+
+
+def saturate_color(color, amount):
+    r, g, b = (c / 255 for c in hex_to_rgb(color))
+    h, l, _s = colorsys.rgb_to_hls(r, g, b)
+    return rgb_to_hex(c * 255 for c in colorsys.hls_to_rgb(h, l, amount))
+
+
+class Color:
+    """A template value with pywal's modifiers ({color1.rgb}, {color1.strip}, ...)"""
+    alpha_num = "100"
+
+    def __init__(self, hex_color):
+        self.hex_color = hex_color
+
+    def __str__(self):
+        return self.hex_color
+
+    def __format__(self, spec):
+        return format(self.hex_color, spec)
+
+    @property
+    def rgb(self):
+        return "%s,%s,%s" % hex_to_rgb(self.hex_color)
+
+    @property
+    def rgba(self):
+        return "rgba(%s,%s,%s,%s)" % (*hex_to_rgb(self.hex_color), int(self.alpha_num) / 100)
+
+    @property
+    def xrgba(self):
+        return "%s/%s/%s/ff" % tuple("%02x" % c for c in hex_to_rgb(self.hex_color))
+
+    @property
+    def alpha(self):
+        return "[%s]%s" % (self.alpha_num, self.hex_color)
+
+    @property
+    def strip(self):
+        return self.hex_color[1:]
+
+    @property
+    def red(self):
+        return str(hex_to_rgb(self.hex_color)[0] / 255)
+
+    @property
+    def green(self):
+        return str(hex_to_rgb(self.hex_color)[1] / 255)
+
+    @property
+    def blue(self):
+        return str(hex_to_rgb(self.hex_color)[2] / 255)
+
+
+def generate_scheme(image, wallpaper, light=False):
+    """Build a pywal colors.json dict from a decoded (downsampled) image.
+
+    16 colors are clustered from the image and sorted by brightness, then
+    arranged and adjusted like pywal's own 'wal' backend does.
+    """
+    colors = [rgb for rgb, _share in palette(image, 16)]
+    if not colors:
+        return None
+    # Flat images give fewer clusters; pad with lighter shades of the last one
+    while len(colors) < 16:
+        last = colors[-1]
+        colors.append(tuple(c + (255 - c) * 0.25 for c in last))
+    colors.sort(key=lambda c: 0.299 * c[0] + 0.587 * c[1] + 0.114 * c[2])
+    colors = [rgb_to_hex(c) for c in colors]
+
+    raw = colors[:1] + colors[8:16] + colors[8:-1]
+    if light:
+        raw = [saturate_color(c, 0.5) for c in raw]
+        raw[0] = lighten_color(colors[-1], 0.85)
+        raw[7] = colors[0]
+        raw[8] = darken_color(colors[-1], 0.4)
+        raw[15] = colors[0]
+    else:
+        if raw[0][1] != "0":
+            raw[0] = darken_color(raw[0], 0.40)
+        raw[7] = blend_color(raw[7], "#eeeeee")
+        raw[8] = darken_color(raw[7], 0.30)
+        raw[15] = blend_color(raw[15], "#eeeeee")
+
+    return {
+        "wallpaper": wallpaper,
+        "alpha": "100",
+        "special": {"background": raw[0], "foreground": raw[15], "cursor": raw[15]},
+        "colors": {f"color{i}": color for i, color in enumerate(raw)},
+    }
+
+
+def flatten_scheme(scheme):
+    """Template variables for a scheme, as pywal passes them to str.format()"""
+    values = {"wallpaper": scheme["wallpaper"], "alpha": scheme["alpha"], **scheme["special"], **scheme["colors"]}
+    return {key: Color(value) for key, value in values.items()}
+
+
+def sequences(scheme):
+    """Terminal escape sequences that switch a running terminal to the scheme"""
+    colors = scheme["colors"]
+    special = scheme["special"]
+    parts = ["\033]4;%s;%s\033\\" % (i, colors[f"color{i}"]) for i in range(16)]
+    parts.append("\033]10;%s\033\\" % special["foreground"])
+    parts.append("\033]11;%s\033\\" % special["background"])
+    parts.append("\033]12;%s\033\\" % special["cursor"])
+    parts.append("\033]708;%s\033\\" % special["background"])
+    return "".join(parts)
+
+
+class SchemeJob(QRunnable):
+    def __init__(self, wal_colors, path):
+        super().__init__()
+        self.wal_colors = wal_colors
+        self.path = path
+
+    def run(self):
+        self.wal_colors.precompute_allowed.wait()  # an apply is pending
+        if self.wal_colors.should_stop:
+            return
+        # The pool thread also runs interactive work, only lower it for this job
+        thread = QThread.currentThread()
+        priority = thread.priority()
+        if priority == QThread.InheritPriority:
+            priority = QThread.NormalPriority  # can't be set back
+        thread.setPriority(QThread.LowestPriority)
+        try:
+            self.wal_colors.scheme(self.path)
+        finally:
+            thread.setPriority(priority)
+
+
+class WalColors:
+    """In-process pywal replacement with a per-image scheme cache.
+
+    export() writes the same files `wal -i` would, through pywal when it is installed.
+    """
+
+    def __init__(self, cache_dir=None, decoders=None, light=False):
+        self.directory = cache_dir or os.path.join(default_cache_root(), "schemes")
+        self.decoders = decoders or DecoderChain()
+        self.light = light
+        self.should_stop = False
+        self.pool = QThreadPool()  # precompute()
+        self.pool.setMaxThreadCount(1)
+        self.apply_pool = QThreadPool()  # the scheme of a wallpaper being applied, never queued behind precompute
+        self.apply_pool.setMaxThreadCount(1)
+        self.precompute_allowed = threading.Event()
+        self.precompute_allowed.set()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as e:
+            print(f"Could not create scheme cache at {self.directory}: {e}")
+
+    def cache_path(self, path):
+        uri = Path(os.path.abspath(path)).as_uri()
+        digest = hashlib.md5(uri.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + ".json")
+
+    def lookup(self, path, st=None):
+        """Return the cached scheme for path, or None on miss/stale entry"""
+        try:
+            st = st or os.stat(path)
+            with open(self.cache_path(path), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (
+            entry.get("version") != SCHEME_VERSION
+            or entry.get("mtime") != int(st.st_mtime)
+            or entry.get("size") != st.st_size
+            or entry.get("light") != self.light
+        ):
+            return None
+        return entry.get("scheme")
+
+    def scheme(self, path, wallpaper=None):
+        """Cached or freshly generated scheme for path (None if it can't be decoded).
+
+        wallpaper is what ends up as {wallpaper} in the output, e.g. the
+        converted WebP of an MP4 wallpaper.
+        """
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            print(f"Error reading {path}: {e}")
+            return None
+        scheme = self.lookup(path, st)
+        if scheme is None:
+            image = self.decoders.decode(path, SAMPLE_SIZE)
+            if image is None or image.isNull():
+                return None
+            scheme = generate_scheme(image, path, self.light)
+            if scheme is None:
+                return None
+            self._store(path, st, scheme)
+        if wallpaper:
+            scheme = dict(scheme, wallpaper=wallpaper)
+        return scheme
+
+    def _store(self, path, st, scheme):
+        target = self.cache_path(path)
+        tmp = f"{target}.{os.getpid()}.{id(scheme)}.tmp"
+        entry = {
+            "version": SCHEME_VERSION,
+            "mtime": int(st.st_mtime),
+            "size": st.st_size,
+            "light": self.light,
+            "scheme": scheme,
+        }
+        try:
+            with open(tmp, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp, target)
+        except OSError as e:
+            print(f"Could not cache color scheme for {path}: {e}")
+
+    def precompute(self, paths):
+        """Generate missing schemes in the background, one image at a time"""
+        self.should_stop = False
+        for path in paths:
+            self.pool.start(SchemeJob(self, path))
+
+    def pause_precompute(self, paused):
+        """Hold back queued precompute jobs while a wallpaper is being applied"""
+        if paused:
+            self.precompute_allowed.clear()
+        else:
+            self.precompute_allowed.set()
+
+    def stop(self):
+        self.should_stop = True
+        self.pool.clear()
+        self.precompute_allowed.set()
+
+    def export(self, scheme):
+        """Write pywal's output files for scheme and recolor open terminals"""
+        if pywal is not None:
+            try:
+                pywal.export.every(scheme)
+                pywal.sequences.send(scheme)
+                return
+            except Exception as e:
+                print(f"pywal export failed, writing colors directly: {e}")
+
+        out_dir = wal_cache_dir()
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, "colors.json"), "w") as f:
+            json.dump(scheme, f, indent=4)
+        with open(os.path.join(out_dir, "colors"), "w") as f:
+            f.write("\n".join(scheme["colors"][f"color{i}"] for i in range(16)) + "\n")
+        with open(os.path.join(out_dir, "wal"), "w") as f:
+            f.write(scheme["wallpaper"])
+
+        values = flatten_scheme(scheme)
+        template_dir = wal_template_dir()
+        if os.path.isdir(template_dir):
+            for template in sorted(os.listdir(template_dir)):
+                source = os.path.join(template_dir, template)
+                if template.startswith(".") or not os.path.isfile(source):
+                    continue
+                try:
+                    with open(source, "r") as f:
+                        rendered = f.read().format(**values)
+                    with open(os.path.join(out_dir, template), "w") as f:
+                        f.write(rendered)
+                except (OSError, KeyError, ValueError, IndexError, AttributeError) as e:
+                    print(f"Error rendering wal template {template}: {e}")
+
+        escape = sequences(scheme)
+        with open(os.path.join(out_dir, "sequences"), "w") as f:
+            f.write(escape)
+        for tty in glob.glob("/dev/pts/[0-9]*"):
+            try:
+                with open(tty, "w") as f:
+                    f.write(escape)
+            except OSError:
+                pass
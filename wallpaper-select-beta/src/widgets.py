@@ -1,312 +1,621 @@
-import os
-from PySide6.QtCore import Qt, QTimer, QSize
-from PySide6.QtGui import QPixmap, QMouseEvent, QFont, QPainter, QColor, QKeyEvent
-from PySide6.QtWidgets import QWidget, QLabel, QVBoxLayout, QHBoxLayout, QScrollArea
-
-
-class ClickableLabel(QLabel):
-    """Clickable label with loading state"""
-
-    def __init__(self, image_path, thumbnail_size=200, parent=None):
-        super().__init__(parent)
-        self.image_path = image_path
-        self.thumbnail_size = thumbnail_size
-        self.loaded = False
-        self._orig_pixmap = None
-
-        self.setAlignment(Qt.AlignCenter)
-        self.setCursor(Qt.ArrowCursor)
-        self.setStyleSheet(
-            """
-            QLabel {
-                background-color: #44475a;
-                border-radius: 8px;
-                border: 2px solid transparent;
-            }
-            """
-        )
-
-        self.show_loading_state()
-
-    def show_loading_state(self):
-        """Show loading placeholder"""
-        pixmap = QPixmap(self.thumbnail_size, int(self.thumbnail_size * 0.75))
-        pixmap.fill(QColor("#44475a"))
-
-        painter = QPainter(pixmap)
-        painter.setPen(QColor("#f8f8f2"))
-        painter.setFont(QFont("Arial", 8))
-        painter.drawText(pixmap.rect(), Qt.AlignCenter, "Loading...")
-        painter.end()
-
-        self.setPixmap(pixmap)
-
-        filename = os.path.basename(self.image_path)
-        if len(filename) > 25:
-            filename = filename[:22] + "..."
-        self.setToolTip(filename)
-
-    def set_loaded_pixmap(self, pixmap):
-        """Set the actual loaded pixmap"""
-        self._orig_pixmap = pixmap
-        if self.width() > 0 and self.height() > 0:
-            self._render_fit_pixmap(self.width(), self.height())
-        else:
-            self.setPixmap(pixmap)
-        self.loaded = True
-
-        filename = os.path.basename(self.image_path)
-        size_info = f"{pixmap.width()}x{pixmap.height()}"
-        self.setToolTip(f"{filename}\n{size_info}")
-
-    def _render_fit_pixmap(self, target_w: int, target_h: int):
-        """Render current image to fill target size by cropping (cover)."""
-        try:
-            source = self._orig_pixmap if (self.loaded and self._orig_pixmap) else self.pixmap()
-            if not source or source.isNull():
-                return
-            scaled = source.scaled(
-                target_w,
-                target_h,
-                Qt.KeepAspectRatioByExpanding,
-                Qt.SmoothTransformation,
-            )
-            x = max(0, (scaled.width() - target_w) // 2)
-            y = max(0, (scaled.height() - target_h) // 2)
-            cropped = scaled.copy(x, y, target_w, target_h)
-            self.setPixmap(cropped)
-        except Exception:
-            self.setPixmap(
-                source.scaled(
-                    target_w, target_h, Qt.IgnoreAspectRatio, Qt.SmoothTransformation
-                )
-            )
-
-    def mousePressEvent(self, event: QMouseEvent):
-        event.ignore()
-
-
-class FlexGridWidget(QWidget):
-    """Widget that manages flexbox-like layout with minimum heights"""
-
-    def __init__(self, parent=None):
+import time
+from array import array
+from itertools import chain
+from PySide6.QtCore import Qt, QTimer, QRect, QRectF, QEvent, Signal
+from PySide6.QtGui import QMouseEvent, QFont, QPainter, QColor, QKeyEvent, QPen, QPixmap
+from PySide6.QtWidgets import QAbstractScrollArea, QToolTip
+
+import tracing
+from catalog import FAILED
+from pixmap_cache import PixmapCache
+from search import Query, SearchEngine
+
+
+class FlexGridWidget(QAbstractScrollArea):
+    """Virtualized thumbnail grid of catalog entry ids."""
+    activated = Signal(str)
+    visible_range_changed = Signal()
+    render_requested = Signal(list)  # entry ids whose thumbnails need rendering at render_size()
+
+    def __init__(self, catalog, thumbnail_size=180, parent=None):
         super().__init__(parent)
         self.setFocusPolicy(Qt.StrongFocus)
-        self.image_labels = []
-        self.label_frames = []
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.setFrameShape(QAbstractScrollArea.NoFrame)
+
+        self.catalog = catalog
+        self.thumbnail_size = thumbnail_size
+        self.entry_ids = []
+        self.items = []
+        self._positions = array("i")
+        self.pixmaps = PixmapCache()
+        self._placeholders = {}
+        self.search = SearchEngine(catalog)
+        self.filter_query = Query("")
         self.selected_index = -1
-        self.min_item_height = 100
+        self.hovered_index = -1
+        self.preview = None  # optional previews.AnimatedPreview
+        self.prefetch = 16
+        self.prefetch_seconds = 0.5
+        self.max_prefetch_rows = 20
+        self.scroll_velocity = 0.0
+        self._last_scroll_time = 0.0
+
+        self.min_cell = 160
         self.item_spacing = 0
         self.margin = 0
-
-        self.main_layout = QVBoxLayout(self)
-        self.main_layout.setContentsMargins(self.margin, self.margin, self.margin, self.margin)
-        self.main_layout.setSpacing(self.item_spacing)
-        self.main_layout.setAlignment(Qt.AlignTop | Qt.AlignLeft)
-
-        self.rows = []
-
-    def add_image_label(self, label):
-        """Add image label to flex layout without extra container"""
-        label.setStyleSheet(
-            """
-            QLabel {
-                background-color: #313244;
-                border-radius: 12px;
-                border: 2px solid transparent;
-                padding: 0px;
-            }
-            """
-        )
-        label.setMinimumHeight(self.min_item_height)
-        self.image_labels.append(label)
-        self.label_frames.append(label)
-
-        if self.width() > 100:
-            self.layout_items()
-
-    def layout_items(self):
-        """Layout items in flexbox-like manner"""
-        if not self.label_frames:
+        self.cols = 1
+        self.item_width = self.min_cell
+        self.item_height = int(self.min_cell * 0.75)
+        self.content_inset = 6  # 2px border + 4px padding
+        self.last_layout_ms = 0.0
+        self.last_paint_ms = 0.0
+
+        self.resizing = False
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.timeout.connect(self.finish_resize)
+        self._render_pending = set()  # entry ids requested at the current render size
+        self._render_batch = []
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.timeout.connect(self._request_renders)
+        # Entries the filter dropped before their metadata was known are re-admitted in batches
+        self.refilter_timer = QTimer(self)
+        self.refilter_timer.setSingleShot(True)
+        self.refilter_timer.setInterval(100)
+        self.refilter_timer.timeout.connect(self._refresh_items)
+
+        # Auto-repeated arrow keys only record the target; queued repeats are
+        # applied as one move, and the animated preview waits for the key to settle
+        self.navigating = False
+        self._nav_index = -1
+        self.nav_timer = QTimer(self)
+        self.nav_timer.setSingleShot(True)
+        self.nav_timer.timeout.connect(self._apply_navigation)
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.timeout.connect(self._navigation_settled)
+
+    def set_preview(self, preview):
+        """Play animated previews for the hovered (else selected) cell"""
+        self.preview = preview
+        self.viewport().setMouseTracking(True)
+        preview.frame_changed.connect(lambda entry_id: self.update_cell(self.position_of(entry_id)))
+        self._update_preview()
+
+    def _update_preview(self):
+        if self.preview is None or self.navigating:
+            return
+        index = self.hovered_index if self.hovered_index != -1 else self.selected_index
+        self.preview.set_target(self.items[index] if 0 <= index < len(self.items) else -1)
+        if index != -1:
+            first, last = self.visible_range()
+            self.preview.set_paused(not first <= index < last)
+
+    def set_entries(self, entry_ids):
+        """Replace the grid contents"""
+        self.entry_ids = []
+        self.items = []
+        self._positions = array("i")
+        self.search.clear()
+        self.catalog.visible_count = 0
+        self.pixmaps.clear()
+        self.selected_index = -1
+        self.hovered_index = -1
+        self.verticalScrollBar().setValue(0)
+        self.viewport().update()
+        self.add_entries(entry_ids)
+
+    def add_entries(self, entry_ids):
+        """Append items to the grid.
+
+        New items only extend the tail row(s): the column layout is left
+        alone and only cells from the old tail row onwards are repainted.
+        """
+        for entry_id in entry_ids:
+            self.search.add(entry_id)
+        if self.filter_query.ranked:
+            # Results are in score order, new matches can land anywhere
+            self.entry_ids.extend(entry_ids)
+            self._refresh_items()
             return
 
-        self.clear_layout()
-
-        visible_frames = [w for w in self.label_frames if w.isVisible()]
-        if not visible_frames:
+        first_new = len(self.items)
+        query = self.filter_query
+        positions = self._positions
+        capacity = self.catalog.capacity()
+        if len(positions) < capacity:
+            positions.extend([-1] * (capacity - len(positions)))
+        for entry_id in entry_ids:
+            self.entry_ids.append(entry_id)
+            if query.empty or self.search.match(query, entry_id) is not None:
+                positions[entry_id] = len(self.items)
+                self.items.append(entry_id)
+        self.catalog.visible_count = len(self.items)
+        if len(self.items) == first_new:
             return
 
-        available_width = self.width() - (self.margin * 2)
+        self.update_scroll_range()
+        tail = self.cell_rect(first_new - first_new % self.cols)
+        if tail.top() < self.viewport().height():
+            self.viewport().update(0, tail.top(), self.viewport().width(), self.viewport().height() - tail.top())
+        lo, hi = self.kept_range()
+        if first_new < hi:
+            self.update_visible_range()
+
+    def position_of(self, entry_id):
+        """Index of entry_id in the current items, or -1"""
+        if 0 <= entry_id < len(self._positions):
+            return self._positions[entry_id]
+        return -1
+
+    def metadata_changed(self, entry_id):
+        """Dimensions or palette of entry_id arrived; re-run the filter if it now matches"""
+        if self.search.metadata_changed(self.filter_query, entry_id) and not self.refilter_timer.isActive():
+            self.refilter_timer.start()
+
+    def set_thumbnail(self, entry_id, image, rendered=None):
+        """Show a loaded thumbnail (plus its cell-sized render), if its cell is in the kept window"""
+        index = self.position_of(entry_id)
+        lo, hi = self.kept_range()
+        if not (lo <= index < hi):
+            return
+        self.pixmaps.put(entry_id, image)
+        if rendered is not None:
+            self.pixmaps.set_rendered(entry_id, (rendered.width(), rendered.height()), rendered)
+        self.viewport().update(self.cell_rect(index))
+
+    def set_rendered(self, entry_id, rendered):
+        """Store a thumbnail re-rendered by the workers after a cell size change"""
+        self._render_pending.discard(entry_id)
+        if entry_id in self.pixmaps:
+            self.pixmaps.set_rendered(entry_id, (rendered.width(), rendered.height()), rendered)
+            self.update_cell(self.position_of(entry_id))
+
+    def render_size(self):
+        """(width, height, device pixel ratio) of a cell's thumbnail area in device pixels"""
+        dpr = self.devicePixelRatioF()
+        width = self.item_width - 2 * self.content_inset
+        height = self.item_height - 2 * self.content_inset
+        return round(width * dpr), round(height * dpr), dpr
+
+    def compute_geometry(self, width):
+        """Return (columns, item width, item height) for a viewport width"""
+        available_width = width - (self.margin * 2)
         if available_width <= 0:
             available_width = 1000
 
-        min_cell = 160
+        min_cell = self.min_cell
         target_cols = max(2, min(8, available_width // min_cell))
         item_width = max(
             min_cell, (available_width - (self.item_spacing * (target_cols - 1))) // target_cols
         )
+        cols = max(1, (available_width + self.item_spacing) // (item_width + self.item_spacing))
+        return cols, item_width, int(item_width * 0.75)
 
-        items_per_row = max(1, (available_width + self.item_spacing) // (item_width + self.item_spacing))
-
-        current_row = None
-        for visible_index, frame in enumerate(visible_frames):
-            if visible_index % items_per_row == 0:
-                current_row = QHBoxLayout()
-                current_row.setSpacing(self.item_spacing)
-                current_row.setContentsMargins(0, 0, 0, 0)
-                current_row.setAlignment(Qt.AlignLeft)
-                self.rows.append(current_row)
-                self.main_layout.addLayout(current_row)
-
-            if frame.parent() != self:
-                frame.setParent(self)
-            frame.setFixedSize(item_width, int(item_width * 0.75))
-            if isinstance(frame, ClickableLabel):
-                frame._render_fit_pixmap(frame.width(), frame.height())
-            current_row.addWidget(frame)
-
-        self.update_selection()
-
-    def clear_layout(self):
-        """Properly clear the layout"""
-        for row_layout in self.rows:
-            while row_layout.count():
-                row_layout.takeAt(0)
-
-        for row_layout in self.rows:
-            self.main_layout.removeItem(row_layout)
-            row_layout.deleteLater()
-
-        self.rows.clear()
-
-    def update_selection(self):
-        """Update visual selection indicator"""
-        for i, frame in enumerate(self.label_frames):
-            if i == self.selected_index:
-                frame.setStyleSheet(
-                    """
-                    QLabel {
-                        background-color: #383a59;
-                        border-radius: 12px;
-                        border: 2px solid #89b4fa;
-                        padding: 4px;
-                    }
-                    """
-                )
-            else:
-                frame.setStyleSheet(
-                    """
-                    QLabel {
-                        background-color: #313244;
-                        border-radius: 12px;
-                        border: 2px solid transparent;
-                        padding: 4px;
-                    }
-                    """
-                )
+    @tracing.traced("grid.layout")
+    def layout_items(self):
+        """Re-flow the grid for the current viewport size.
+
+        Cells are only re-flowed when the column count changes. A new cell
+        size without a column change just repaints: thumbnails without a
+        render at the new size are drawn with a fast scale until the workers
+        deliver smooth ones (see finish_resize).
+        """
+        start = time.perf_counter()
+        cols, item_width, item_height = self.compute_geometry(self.viewport().width())
+        cols_changed = cols != self.cols
+        size_changed = (item_width, item_height) != (self.item_width, self.item_height)
+        self.cols, self.item_width, self.item_height = cols, item_width, item_height
+
+        self.update_scroll_range()
+        if cols_changed or size_changed:
+            self.viewport().update()
+        if cols_changed and self.selected_index != -1:
+            self.ensure_visible(self.selected_index)
+        self.update_visible_range()
+        self.last_layout_ms = (time.perf_counter() - start) * 1000
+
+    def update_scroll_range(self):
+        rows = (len(self.items) + self.cols - 1) // self.cols
+        content_height = rows * self.row_height() - self.item_spacing + self.margin * 2
+        sb = self.verticalScrollBar()
+        sb.setRange(0, max(0, content_height - self.viewport().height()))
+        sb.setPageStep(self.viewport().height())
+        sb.setSingleStep(max(1, self.item_height // 4))
+
+    def row_height(self):
+        return self.item_height + self.item_spacing
+
+    def cell_rect(self, index):
+        row, col = divmod(index, self.cols)
+        x = self.margin + col * (self.item_width + self.item_spacing)
+        y = self.margin + row * self.row_height() - self.verticalScrollBar().value()
+        return QRect(x, y, self.item_width, self.item_height)
+
+    def visible_range(self):
+        """Return [first, last) item indices intersecting the viewport"""
+        if not self.items:
+            return 0, 0
+        top = self.verticalScrollBar().value() - self.margin
+        first_row = max(0, top // self.row_height())
+        last_row = (top + self.viewport().height()) // self.row_height()
+        return first_row * self.cols, min(len(self.items), (last_row + 1) * self.cols)
+
+    def current_velocity(self):
+        """Smoothed scroll speed in px/s (negative = up), 0 once scrolling stops"""
+        if time.monotonic() - self._last_scroll_time > 0.25:
+            return 0.0
+        return self.scroll_velocity
+
+    def prefetch_range(self):
+        """Items to load ahead of the viewport in the scroll direction.
+
+        The window is 'prefetch' items plus however many rows the current
+        scroll speed covers in prefetch_seconds.
+        """
+        first, last = self.visible_range()
+        velocity = self.current_velocity()
+        rows = min(self.max_prefetch_rows, abs(velocity) * self.prefetch_seconds / self.row_height())
+        count = self.prefetch + int(rows) * self.cols
+        if velocity < 0:
+            return max(0, first - count), first
+        return last, min(len(self.items), last + count)
+
+    def kept_range(self):
+        """Visible range plus the prefetch window and one page either side"""
+        first, last = self.visible_range()
+        page = max(self.cols, last - first)
+        lo, hi = self.prefetch_range()
+        return max(0, min(lo, first - page)), min(len(self.items), max(hi, last + page))
+
+    @tracing.traced("grid.visible_range")
+    def update_visible_range(self):
+        """Evict thumbnails outside the kept window if over budget and notify the scheduler"""
+        lo, hi = self.kept_range()
+        self.pixmaps.evict(lambda entry_id: lo <= self.position_of(entry_id) < hi)
+        self._update_preview()
+        self.visible_range_changed.emit()
+
+    def index_at(self, pos):
+        x = pos.x() - self.margin
+        y = pos.y() - self.margin + self.verticalScrollBar().value()
+        if x < 0 or y < 0:
+            return -1
+        col = x // (self.item_width + self.item_spacing)
+        row = y // self.row_height()
+        if col >= self.cols:
+            return -1
+        index = row * self.cols + col
+        return index if index < len(self.items) else -1
+
+    @tracing.traced("grid.paint")
+    def paintEvent(self, event):
+        start = time.perf_counter()
+        painter = QPainter(self.viewport())
+        painter.setRenderHint(QPainter.Antialiasing)
+        first, last = self.visible_range()
+        for index in range(first, last):
+            rect = self.cell_rect(index)
+            if rect.intersects(event.rect()):
+                self._paint_cell(painter, rect, self.items[index], index == self.selected_index)
+        painter.end()
+        self.last_paint_ms = (time.perf_counter() - start) * 1000
+
+    def _paint_cell(self, painter, rect, entry_id, selected):
+        if selected:
+            painter.setPen(QPen(QColor("#89b4fa"), 2))
+            painter.setBrush(QColor("#383a59"))
+        else:
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor("#313244"))
+        painter.drawRoundedRect(rect.adjusted(1, 1, -1, -1), 12, 12)
+
+        content = rect.adjusted(
+            self.content_inset, self.content_inset, -self.content_inset, -self.content_inset
+        )
+        if content.width() <= 0 or content.height() <= 0:
+            return
+        frame = self.preview.current_frame(entry_id) if self.preview else None
+        if frame is not None:
+            painter.save()
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            self._draw_cover(painter, content, frame)
+            painter.restore()
+            return
+        pixmap = self.pixmaps.rendered(entry_id, self.render_size()[:2])
+        if pixmap is not None:
+            painter.drawPixmap(content.topLeft(), pixmap)
+            return
+        stale = self.pixmaps.any_rendered(entry_id) or self.pixmaps.get(entry_id)
+        if stale is None or stale.isNull():
+            failed = self.catalog.states[entry_id] == FAILED
+            pixmap = self._placeholder(content.width(), content.height(), "No preview" if failed else "Loading...")
+            painter.drawPixmap(content.topLeft(), pixmap)
+            return
+        # No render at this size yet: scale on the fly without filtering
+        # (cheap enough for every frame of a live resize) and have the
+        # workers render a smooth copy once the size stops changing
+        self._draw_cover(painter, content, stale)
+        if not self.resizing:
+            self._queue_render(entry_id)
+
+    @staticmethod
+    def _draw_cover(painter, target, image):
+        """Draw image (QImage or QPixmap) scaled to fill target, cropped centered"""
+        scale = max(target.width() / image.width(), target.height() / image.height())
+        source_w, source_h = target.width() / scale, target.height() / scale
+        source = QRectF((image.width() - source_w) / 2, (image.height() - source_h) / 2, source_w, source_h)
+        if isinstance(image, QPixmap):
+            painter.drawPixmap(QRectF(target), image, source)
+        else:
+            painter.drawImage(QRectF(target), image, source)
+
+    def _placeholder(self, width, height, text):
+        """Placeholder pixmap shared by every cell without a thumbnail"""
+        key = (width, height, text)
+        pixmap = self._placeholders.get(key)
+        if pixmap is None:
+            if len(self._placeholders) > 8:
+                self._placeholders.clear()  # cell size changed
+            pixmap = QPixmap(width, height)
+            pixmap.fill(QColor("#44475a"))
+            painter = QPainter(pixmap)
+            painter.setPen(QColor("#f8f8f2"))
+            painter.setFont(QFont("Arial", 8))
+            painter.drawText(pixmap.rect(), Qt.AlignCenter, text)
+            painter.end()
+            self._placeholders[key] = pixmap
+        return pixmap
+
+    def _queue_render(self, entry_id):
+        if entry_id not in self._render_pending:
+            self._render_pending.add(entry_id)
+            self._render_batch.append(entry_id)
+            self.render_timer.start(0)
+
+    def _request_renders(self):
+        batch, self._render_batch = self._render_batch, []
+        self.render_requested.emit(batch)
+
+    @tracing.traced("grid.finish_resize")
+    def finish_resize(self):
+        """The size settled: re-render the thumbnails in the kept window smoothly, visible ones first"""
+        self.resizing = False
+        self.layout_items()
+        self._render_pending.clear()
+        self._render_batch = []
+        size = self.render_size()[:2]
+        first, last = self.visible_range()
+        lo, hi = self.kept_range()
+        for index in chain(range(first, last), range(lo, first), range(last, hi)):
+            entry_id = self.items[index]
+            if entry_id in self.pixmaps and self.pixmaps.rendered(entry_id, size) is None:
+                self._queue_render(entry_id)
+        self.render_timer.start(0)  # also reports the new size when nothing needs rendering
+
+    def update_cell(self, index):
+        if 0 <= index < len(self.items):
+            self.viewport().update(self.cell_rect(index))
 
     def select_item(self, index):
         """Select an item by index"""
-        if 0 <= index < len(self.image_labels):
+        if 0 <= index < len(self.items):
+            previous = self.selected_index
             self.selected_index = index
-            self.update_selection()
-
-            if self.label_frames:
-                selected_frame = self.label_frames[index]
-                scroll_area = self.parent()
-                while scroll_area and not isinstance(scroll_area, QScrollArea):
-                    scroll_area = scroll_area.parent()
-
-                if scroll_area:
-                    scroll_area.ensureWidgetVisible(selected_frame)
-
+            self.update_cell(previous)
+            self.update_cell(index)
+            self.ensure_visible(index)
+            self._update_preview()
+
+    def ensure_visible(self, index):
+        rect = self.cell_rect(index)
+        sb = self.verticalScrollBar()
+        if rect.top() < 0:
+            sb.setValue(sb.value() + rect.top() - self.margin)
+        elif rect.bottom() > self.viewport().height():
+            sb.setValue(sb.value() + rect.bottom() - self.viewport().height() + self.margin + 1)
+
+    def selected_id(self):
+        if 0 <= self.selected_index < len(self.items):
+            return self.items[self.selected_index]
+        return None
+
+    def selected_path(self):
+        entry_id = self.selected_id()
+        return None if entry_id is None else self.catalog.paths[entry_id]
+
+    def _rebuild_items(self):
+        """Recompute the filtered items and the id -> position map"""
+        selected = self.selected_id()
+        self.hovered_index = -1
+        self.items = self.search.search(self.filter_query.text, self.entry_ids)
+        self._positions = array("i", [-1]) * self.catalog.capacity()
+        for index, entry_id in enumerate(self.items):
+            self._positions[entry_id] = index
+        self.catalog.visible_count = len(self.items)
+        self.selected_index = -1 if selected is None else self.position_of(selected)
+
+    @tracing.traced("grid.apply_changes")
+    def apply_changes(self, added_ids, removed_ids):
+        """Drop removed entries and insert added ones in path order, in one pass"""
+        previous_index = self.selected_index
+        if removed_ids:
+            removed = set(removed_ids)
+            self.entry_ids = [i for i in self.entry_ids if i not in removed]
+            for entry_id in removed:
+                self.search.remove(entry_id)
+                self.pixmaps.pop(entry_id)
+
+        paths = self.catalog.paths
+        for entry_id in added_ids:
+            self.search.add(entry_id)
+            path = paths[entry_id]
+            lo, hi = 0, len(self.entry_ids)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if paths[self.entry_ids[mid]] < path:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            self.entry_ids.insert(lo, entry_id)
+        self._refresh_items(previous_index)
+
+    def _refresh_items(self, previous_index=-1):
+        """Re-run the current query after entries changed, keeping the scroll position"""
+        if previous_index == -1:
+            previous_index = self.selected_index
+        self._rebuild_items()
+        self.update_scroll_range()
+        self.viewport().update()
+        self.update_visible_range()
+        if self.selected_index == -1 and self.items:
+            self.select_item(min(max(previous_index, 0), len(self.items) - 1))
+
+    def invalidate(self, entry_ids):
+        """Forget the thumbnails of entries whose files changed on disk"""
+        for entry_id in entry_ids:
+            self.pixmaps.pop(entry_id)
+            self.update_cell(self.position_of(entry_id))
+        self.update_visible_range()
+
+    @tracing.traced("grid.filter")
     def filter_by_text(self, text: str) -> int:
-        """Filter items by filename substring (case-insensitive). Returns visible count."""
-        query = (text or "").strip().lower()
-        visible_count = 0
-        for label in self.image_labels:
-            filename = os.path.basename(label.image_path).lower()
-            is_match = (query in filename) if query else True
-            label.setVisible(is_match)
-            if is_match:
-                visible_count += 1
-        self.layout_items()
-        if not (0 <= self.selected_index < len(self.image_labels)) or not self.image_labels[self.selected_index].isVisible():
-            for idx, lbl in enumerate(self.image_labels):
-                if lbl.isVisible():
-                    self.select_item(idx)
-                    break
-        else:
-            self.update_selection()
-        return visible_count
-
-    def select_label(self, label):
-        """Select item by label widget and focus grid for keyboard navigation"""
-        try:
-            index = self.image_labels.index(label)
-        except ValueError:
-            return
-        self.select_item(index)
-        self.setFocus()
+        """Filter and rank items with a search query (see search.Query). Returns visible count."""
+        self.filter_query = Query((text or "").lstrip())
+        self._rebuild_items()
+
+        self.verticalScrollBar().setValue(0)
+        self.update_scroll_range()
+        self.viewport().update()
+        self.update_visible_range()
+        if self.items and (self.selected_index == -1 or self.filter_query.ranked):
+            self.select_item(0)  # best match first
+        elif self.selected_index != -1:
+            self.ensure_visible(self.selected_index)
+        return len(self.items)
 
     def get_items_per_row(self):
         """Calculate current items per row"""
-        if not self.rows:
-            return 1
-        if self.rows:
-            first_row = self.rows[0]
-            count = 0
-            for i in range(first_row.count()):
-                item = first_row.itemAt(i)
-                if item and item.widget():
-                    count += 1
-            return max(1, count)
-        return 1
+        return self.cols
+
+    def navigation_target(self, key, index):
+        """Item index a navigation key moves to from index (None for other keys)"""
+        last = len(self.items) - 1
+        cols = self.cols
+        page = max(1, self.viewport().height() // self.row_height()) * cols
+        if key == Qt.Key_Right:
+            return min(index + 1, last)
+        if key == Qt.Key_Left:
+            return max(index - 1, 0)
+        if key == Qt.Key_Down:
+            return min(index + cols, last)
+        if key == Qt.Key_Up:
+            return max(index - cols, 0)
+        if key == Qt.Key_PageDown:
+            return min(index + page, last)
+        if key == Qt.Key_PageUp:
+            return max(index - page, 0)
+        if key == Qt.Key_Home:
+            return 0
+        if key == Qt.Key_End:
+            return last
+        return None
 
     def keyPressEvent(self, event: QKeyEvent):
         """Handle keyboard navigation"""
-        if not self.image_labels:
+        if not self.items:
             super().keyPressEvent(event)
             return
 
-        items_per_row = self.get_items_per_row()
-        current_index = self.selected_index
-
+        current_index = self._nav_index if self._nav_index != -1 else self.selected_index
         if current_index == -1:
             current_index = 0
 
-        if event.key() == Qt.Key_Right:
-            new_index = min(current_index + 1, len(self.image_labels) - 1)
-        elif event.key() == Qt.Key_Left:
-            new_index = max(current_index - 1, 0)
-        elif event.key() == Qt.Key_Down:
-            new_index = min(current_index + items_per_row, len(self.image_labels) - 1)
-        elif event.key() == Qt.Key_Up:
-            new_index = max(current_index - items_per_row, 0)
-        elif event.key() in (Qt.Key_Return, Qt.Key_Enter, Qt.Key_Space):
-            if 0 <= current_index < len(self.image_labels):
-                label = self.image_labels[current_index]
-                parent_widget = self.parent()
-                while parent_widget and not hasattr(parent_widget, 'execute_wallpaper_command'):
-                    parent_widget = parent_widget.parent()
-                if parent_widget:
-                    parent_widget.execute_wallpaper_command(label.image_path)
+        if event.key() in (Qt.Key_Return, Qt.Key_Enter, Qt.Key_Space):
+            self._apply_navigation()
+            if 0 <= current_index < len(self.items):
+                self.activated.emit(self.catalog.paths[self.items[current_index]])
             return
-        else:
+        new_index = self.navigation_target(event.key(), current_index)
+        if new_index is None:
             super().keyPressEvent(event)
             return
 
-        self.select_item(new_index)
+        if event.isAutoRepeat():
+            self.navigating = True
+            self._nav_index = new_index
+            self.nav_timer.start(0)
+        else:
+            self.select_item(new_index)
 
-    def resizeEvent(self, event):
-        """Handle widget resize"""
-        super().resizeEvent(event)
-        if not hasattr(self, 'resize_timer'):
-            self.resize_timer = QTimer()
-            self.resize_timer.setSingleShot(True)
-            self.resize_timer.timeout.connect(self.layout_items)
+    def keyReleaseEvent(self, event: QKeyEvent):
+        if not event.isAutoRepeat() and self.navigating:
+            self.settle_timer.start(0)
+        super().keyReleaseEvent(event)
 
-        self.resize_timer.stop()
-        self.resize_timer.start(50)
+    def _apply_navigation(self):
+        if self._nav_index != -1:
+            index, self._nav_index = self._nav_index, -1
+            self.select_item(index)
+            self.settle_timer.start(150)
 
+    def _navigation_settled(self):
+        self._apply_navigation()
+        self.settle_timer.stop()
+        self.navigating = False
+        self._update_preview()
 
+    def mousePressEvent(self, event: QMouseEvent):
+        index = self.index_at(event.position().toPoint())
+        if index != -1:
+            self.select_item(index)
+        self.setFocus()
+
+    def mouseMoveEvent(self, event: QMouseEvent):
+        index = self.index_at(event.position().toPoint())
+        if index != self.hovered_index:
+            self.hovered_index = index
+            self._update_preview()
+        super().mouseMoveEvent(event)
+
+    def leaveEvent(self, event):
+        if self.hovered_index != -1:
+            self.hovered_index = -1
+            self._update_preview()
+        super().leaveEvent(event)
+
+    def viewportEvent(self, event):
+        if event.type() == QEvent.ToolTip:
+            index = self.index_at(event.pos())
+            if index == -1:
+                QToolTip.hideText()
+                return True
+            entry_id = self.items[index]
+            tooltip = self.catalog.name(entry_id)
+            if self.catalog.widths[entry_id]:
+                tooltip += f"\n{self.catalog.widths[entry_id]}x{self.catalog.heights[entry_id]}"
+            QToolTip.showText(event.globalPos(), tooltip, self.viewport())
+            return True
+        return super().viewportEvent(event)
+
+    def scrollContentsBy(self, dx, dy):
+        now = time.monotonic()
+        elapsed = now - self._last_scroll_time
+        if elapsed > 0.25:
+            self.scroll_velocity = 0.0
+        elif elapsed > 0:
+            # dy is negative when scrolling down
+            self.scroll_velocity = 0.7 * self.scroll_velocity + 0.3 * (-dy / elapsed)
+        self._last_scroll_time = now
+        self.viewport().update()
+        self.update_visible_range()
+
+    def resizeEvent(self, event):
+        """Re-flow right away and paint fast scaled thumbnails until the size settles"""
+        super().resizeEvent(event)
+        self.resizing = True
+        self.layout_items()
+        self.resize_timer.start(150)
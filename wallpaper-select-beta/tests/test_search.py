@@ -0,0 +1,90 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from catalog import Catalog
+from search import Query, SearchEngine
+
+
+def make_engine(files):
+    """SearchEngine over (name, width, height, palette) entries"""
+    catalog = Catalog()
+    engine = SearchEngine(catalog)
+    ids = []
+    for name, width, height, colors in files:
+        entry_id = catalog.add(f"/walls/{name}")
+        catalog.set_dimensions(entry_id, width, height)
+        catalog.set_analysis(entry_id, colors, "")
+        engine.add(entry_id)
+        ids.append(entry_id)
+    return catalog, engine, ids
+
+
+def names(catalog, results):
+    return sorted(os.path.basename(catalog.paths[i]) for i in results)
+
+
+FILES = [
+    ("wide.jpg", 5120, 1440, ""),
+    ("forest.png", 3840, 2160, ""),
+    ("city.png", 3840, 1600, ""),
+    ("small.jpg", 1920, 1080, ""),
+]
+
+
+def test_term_growing_into_comparison_does_not_reuse_fuzzy_results():
+    catalog, engine, ids = make_engine(FILES)
+    engine.search("w", ids)
+    typed = engine.search("w>=3840", ids)
+    fresh = SearchEngine(catalog)
+    for entry_id in ids:
+        fresh.add(entry_id)
+    assert names(catalog, typed) == names(catalog, fresh.search("w>=3840", ids))
+    assert names(catalog, typed) == ["city.png", "forest.png", "wide.jpg"]
+
+
+def test_term_growing_into_filter_does_not_reuse_fuzzy_results():
+    catalog, engine, ids = make_engine(FILES)
+    engine.search("ext", ids)
+    assert names(catalog, engine.search("ext:png", ids)) == ["city.png", "forest.png"]
+
+
+def test_growing_name_term_still_narrows():
+    catalog, engine, ids = make_engine(FILES)
+    engine.search("fo", ids)
+    assert names(catalog, engine.search("fore", ids)) == ["forest.png"]
+
+
+def test_hue_range_wrapping_past_zero():
+    catalog, engine, ids = make_engine([
+        ("red.jpg", 1920, 1080, "#e01010:1.0"),
+        ("blue.jpg", 1920, 1080, "#1030e0:1.0"),
+    ])
+    for text in ("hue:red", "hue:350", "hue:340-20"):
+        assert names(catalog, engine.search(text, ids)) == ["red.jpg"], text
+    assert names(catalog, engine.search("hue:180-260", ids)) == ["blue.jpg"]
+
+
+def test_entries_without_metadata_are_searched_again_once_it_arrives():
+    catalog, engine, ids = make_engine(FILES + [("pending.png", 0, 0, "")])
+    pending = ids[-1]
+    assert names(catalog, engine.search("w>=3840 ", ids)) == ["city.png", "forest.png", "wide.jpg"]
+    assert engine.incomplete == {pending}
+    catalog.set_dimensions(pending, 3840, 2160)
+    assert names(catalog, engine.search("w>=3840 pe", ids)) == ["pending.png"]
+    assert not engine.incomplete
+
+
+def test_missing_palette_is_incomplete_but_gray_is_not():
+    catalog, engine, ids = make_engine([("gray.jpg", 1920, 1080, "#808080:1.0"), ("new.jpg", 1920, 1080, "")])
+    assert engine.search("hue:red", ids) == []
+    assert engine.incomplete == {ids[1]}
+
+
+def test_metadata_arriving_for_an_unchanged_query():
+    catalog, engine, ids = make_engine(FILES + [("pending.png", 0, 0, "")])
+    engine.search("w>=3840", ids)
+    catalog.set_dimensions(ids[-1], 3840, 2160)
+    assert engine.metadata_changed(Query("w>=3840"), ids[-1])
+    assert "pending.png" in names(catalog, engine.search("w>=3840", ids))